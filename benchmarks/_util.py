@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Shared helpers for the benchmark scripts (not shipped with the package)."""
+
+import json
+import math
+import os
+import platform
+import re
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+FAKE_GEMINI = Path(__file__).resolve().parent / "fake_gemini.py"
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """Summary stats (ms) with nearest-rank percentiles."""
+    if not values:
+        return {"n": 0}
+    ordered = sorted(values)
+
+    def pct(p: float) -> float:
+        return round(ordered[max(1, math.ceil(p / 100 * len(ordered))) - 1], 4)
+
+    return {
+        "n": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 4),
+        "min": round(ordered[0], 4),
+        "p50": pct(50),
+        "p95": pct(95),
+        "p99": pct(99),
+        "max": round(ordered[-1], 4),
+    }
+
+
+def install_fake_gemini() -> str:
+    """Expose fake_gemini.py as `gemini` in a temp dir; return that dir (prepend it to PATH)."""
+    bin_dir = Path(tempfile.mkdtemp(prefix="gcb-fake-gemini-"))
+    target = bin_dir / "gemini"
+    target.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_GEMINI}" "$@"\n', encoding="utf-8")
+    target.chmod(0o755)
+    return str(bin_dir)
+
+
+def rss_kb(pid: Optional[int] = None) -> Optional[int]:
+    """Resident set size in KiB (Linux /proc, falling back to ru_maxrss for self)."""
+    try:
+        with open(f"/proc/{pid or os.getpid()}/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    if pid is None:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == "darwin" else peak
+    return None
+
+
+def bridge_version() -> str:
+    try:
+        text = (ROOT / "pyproject.toml").read_text(encoding="utf-8")
+    except OSError:
+        return "unknown"
+    m = re.search(r'^version\s*=\s*"([^"]+)"', text, re.MULTILINE)
+    return m.group(1) if m else "unknown"
+
+
+def emit(kind: str, config: Dict[str, object], results: Dict[str, object], out: Optional[str]) -> None:
+    """Print (and optionally save) a machine-readable result document."""
+    doc = {
+        "benchmark": kind,
+        "bridge_version": bridge_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "results": results,
+    }
+    text = json.dumps(doc, indent=2, ensure_ascii=False)
+    if out:
+        Path(out).write_text(text + "\n", encoding="utf-8")
+    print(text)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Micro-benchmarks for bridge hot paths on large synthetic inputs.
+
+Usage: python benchmarks/bench_hotpaths.py [--repeat N] [--scale F] [--only NAME ...] [--out FILE]
+
+Covers _run (against fake_gemini.py), _env_with_path, _truncate, FindFiles,
+ReadFolder, SearchText, ReadManyFiles and Edit. Prints a JSON document (see _util.emit).
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from _util import ROOT, emit, install_fake_gemini, percentiles, rss_kb  # noqa: E402
+
+sys.path.insert(0, str(ROOT))
+try:
+    import gemini_cli_bridge as gcb  # noqa: E402
+except ImportError:  # fastmcp not installed: fall back to the test shim
+    sys.path.insert(0, str(ROOT / "tests"))
+    import gemini_cli_bridge as gcb  # noqa: E402
+
+
+def _time(fn: Callable[[], object], repeat: int, setup: Optional[Callable[[], None]] = None) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def _make_tree(root: Path, dirs: int, files_per_dir: int) -> None:
+    for d in range(dirs):
+        sub = root / f"pkg{d:03d}" / "mod"
+        sub.mkdir(parents=True, exist_ok=True)
+        for f in range(files_per_dir):
+            ext = ".py" if f % 3 == 0 else ".txt"
+            (sub / f"file{f:04d}{ext}").write_text(f"# {d}/{f}\n", encoding="utf-8")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--scale", type=float, default=1.0, help="multiply synthetic input sizes")
+    ap.add_argument("--only", nargs="*", default=None)
+    ap.add_argument("--out", default=None, help="also write the JSON result here")
+    args = ap.parse_args()
+
+    scale = max(args.scale, 0.01)
+    work = Path(tempfile.mkdtemp(prefix="gcb-bench-"))
+    os.environ["PATH"] = install_fake_gemini() + os.pathsep + os.environ.get("PATH", "")
+    os.environ.setdefault("GEMINI_BRIDGE_MAX_OUT", "200000")
+
+    tree = work / "tree"
+    _make_tree(tree, dirs=int(50 * scale) or 1, files_per_dir=int(100 * scale) or 1)
+    big_lines = int(200_000 * scale) or 1
+    big = work / "big.log"
+    big.write_text("".join(f"{i} INFO request ok path=/api/v1/items/{i}\n" if i % 97 else f"{i} ERROR boom\n"
+                           for i in range(big_lines)), encoding="utf-8")
+    many = [str(p) for p in sorted(tree.rglob("*.py"))[: int(500 * scale) or 1]]
+    edit_src = big.read_text(encoding="utf-8")
+    edit_target = work / "edit.log"
+    tree_files = sum(1 for p in tree.rglob("*") if p.is_file())
+    long_text = "X" * int(5_000_000 * scale)
+
+    cases: Dict[str, Dict[str, object]] = {
+        "_run": {"fn": lambda: gcb._run(["gemini", "-m", "bench", "-p", "hi"], raise_on_error=False)},
+        "_env_with_path": {"fn": lambda: gcb._env_with_path({"FOO": "bar"})},
+        "_truncate": {"fn": lambda: gcb._truncate(long_text)},
+        "FindFiles": {"fn": lambda: gcb.FindFiles(pattern="*.py", base=str(tree))},
+        "ReadFolder": {"fn": lambda: gcb.ReadFolder(path=str(tree), recursive=True, max_entries=500, details=True)},
+        "SearchText": {"fn": lambda: gcb.SearchText(pattern="ERROR", path=str(big))},
+        "ReadManyFiles": {"fn": lambda: gcb.ReadManyFiles(paths=many)},
+        "Edit": {
+            "fn": lambda: gcb.Edit(path=str(edit_target), find="ERROR", replace="WARN"),
+            "setup": lambda: edit_target.write_text(edit_src, encoding="utf-8"),
+        },
+    }
+    selected = [n for n in cases if not args.only or n in args.only]
+    results: Dict[str, object] = {}
+    try:
+        for name in selected:
+            case = cases[name]
+            if case.get("setup"):
+                case["setup"]()
+            case["fn"]()  # warm-up
+            results[name] = percentiles(_time(case["fn"], args.repeat, case.get("setup")))
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    results["rss_kb"] = rss_kb()
+    emit(
+        "hotpaths",
+        {
+            "repeat": args.repeat,
+            "scale": scale,
+            "tree_files": tree_files,
+            "search_lines": big_lines,
+            "read_many_files": len(many),
+        },
+        results,
+        args.out,
+    )
+
+
+if __name__ == "__main__":
+    main()
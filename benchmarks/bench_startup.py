@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Startup benchmark: module import cost (`python -X importtime`) and MCP handshake time.
+
+Usage:
+  python benchmarks/bench_startup.py [--repeat N] [--groups gemini,files] [--handshake] [--out FILE]
+
+Each run starts a fresh interpreter. `bridge_own_ms` is the cumulative import time of
+gemini_cli_bridge minus fastmcp (what this repo controls); `top_imports` lists the
+heaviest modules pulled in by the bridge itself. --groups sets GEMINI_BRIDGE_TOOL_GROUPS.
+--handshake also times spawn -> initialize -> tools/list over stdio (needs fastmcp).
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from _util import ROOT, emit, install_fake_gemini, percentiles  # noqa: E402
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """[(module, self_us, cumulative_us, depth), ...] from `-X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2))
+    return rows
+
+
+def import_profile(env: Dict[str, str]) -> Dict[str, object]:
+    """Import the bridge once in a fresh interpreter; return timings (ms) and its imports."""
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import gemini_cli_bridge"],
+        cwd=str(ROOT), env=env, capture_output=True, text=True, check=True,
+    )
+    wall_ms = (time.perf_counter() - t0) * 1000
+    rows = parse_importtime(proc.stderr)
+    # importtime prints children before their parent; a module's subtree ends at its row
+    end = next(i for i, r in enumerate(rows) if r[0] == "gemini_cli_bridge")
+    bridge = rows[end]
+    start = end
+    while start > 0 and rows[start - 1][3] > bridge[3]:
+        start -= 1
+    children = rows[start:end]
+    fastmcp_us = sum(r[2] for r in children if r[0] == "fastmcp" and r[3] == bridge[3] + 1)
+    own = [r for r in children if r[3] == bridge[3] + 1 and r[0] != "fastmcp"]
+    return {
+        "wall_ms": wall_ms,
+        "bridge_ms": bridge[2] / 1000,
+        "bridge_own_ms": (bridge[2] - fastmcp_us) / 1000,
+        "fastmcp_ms": fastmcp_us / 1000,
+        "modules": [r[0] for r in rows],
+        "top_imports": sorted(((r[0], r[2] / 1000) for r in own), key=lambda x: -x[1])[:10],
+    }
+
+
+def handshake_ms(env: Dict[str, str]) -> Optional[float]:
+    from load_stdio import PROTOCOL_VERSION, StdioClient  # keep import local
+
+    t0 = time.perf_counter()
+    client = StdioClient([sys.executable, "-m", "gemini_cli_bridge"], env)
+    try:
+        init = client.request("initialize", {
+            "protocolVersion": PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": {"name": "gcb-startup", "version": "0"},
+        }, timeout=60)
+        if "error" in init:
+            return None
+        client.notify("notifications/initialized")
+        client.request("tools/list", {}, timeout=60)
+        return (time.perf_counter() - t0) * 1000
+    finally:
+        client.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--repeat", type=int, default=10)
+    ap.add_argument("--groups", default=None, help="GEMINI_BRIDGE_TOOL_GROUPS for the runs")
+    ap.add_argument("--handshake", action="store_true", help="also time initialize + tools/list over stdio")
+    ap.add_argument("--out", default=None, help="also write the JSON result here")
+    args = ap.parse_args()
+
+    env = os.environ.copy()
+    env["PATH"] = install_fake_gemini() + os.pathsep + env.get("PATH", "")
+    env["PYTHONPATH"] = str(ROOT) + (os.pathsep + env["PYTHONPATH"] if env.get("PYTHONPATH") else "")
+    if args.groups is not None:
+        env["GEMINI_BRIDGE_TOOL_GROUPS"] = args.groups
+
+    import_profile(env)  # warm the filesystem / bytecode caches
+    runs = [import_profile(env) for _ in range(max(args.repeat, 1))]
+    results: Dict[str, object] = {
+        key: percentiles([float(r[key]) for r in runs])
+        for key in ("wall_ms", "bridge_ms", "bridge_own_ms", "fastmcp_ms")
+    }
+    results["top_imports"] = runs[-1]["top_imports"]
+    if args.handshake:
+        results["handshake_ms"] = percentiles(
+            [v for v in (handshake_ms(env) for _ in range(max(args.repeat // 2, 1))) if v is not None]
+        )
+    emit("startup", {"repeat": args.repeat, "groups": args.groups, "handshake": args.handshake}, results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Configurable stand-in for the `gemini` CLI, used by benchmarks and tests.
+
+Env:
+- FAKE_GEMINI_LATENCY_MS (float): simulated model latency. Default 0.
+- FAKE_GEMINI_JITTER_MS (float): uniform +/- jitter added to the latency. Default 0.
+- FAKE_GEMINI_OUTPUT_BYTES (int): size of the response body. Default 64.
+- FAKE_GEMINI_FAILURE_RATE (float 0..1): probability of exiting 1 with a 429-style error. Default 0.
+- FAKE_GEMINI_SEED (int): seed for reproducible failures/jitter.
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def main(argv) -> int:
+    rng = random.Random(os.getenv("FAKE_GEMINI_SEED") or None)
+    if "--version" in argv:
+        print("0.0.0-fake")
+        return 0
+    if "--list-extensions" in argv:
+        print("No extensions installed.")
+        return 0
+    if argv[:2] == ["mcp", "list"]:
+        print("No MCP servers configured.")
+        return 0
+
+    latency = _float_env("FAKE_GEMINI_LATENCY_MS", 0.0)
+    jitter = _float_env("FAKE_GEMINI_JITTER_MS", 0.0)
+    delay = max(latency + rng.uniform(-jitter, jitter), 0.0) / 1000.0
+    if delay:
+        time.sleep(delay)
+
+    if rng.random() < _float_env("FAKE_GEMINI_FAILURE_RATE", 0.0):
+        print("Error: 429 RESOURCE_EXHAUSTED: Quota exceeded (fake)", file=sys.stderr)
+        return 1
+
+    size = int(_float_env("FAKE_GEMINI_OUTPUT_BYTES", 64))
+    body = ("lorem ipsum " * (size // 12 + 1))[:size]
+    model = argv[argv.index("-m") + 1] if "-m" in argv and argv.index("-m") + 1 < len(argv) else "gemini-2.5-pro"
+    fmt_at = argv.index("--output-format") if "--output-format" in argv else -1
+    json_mode = "--output-format=json" in argv or (fmt_at >= 0 and argv[fmt_at + 1:fmt_at + 2] == ["json"])
+    if json_mode:
+        prompt = argv[argv.index("-p") + 1] if "-p" in argv else ""
+        print(json.dumps({
+            "response": body,
+            "stats": {"models": {model: {
+                "api": {"totalRequests": 1, "totalErrors": 0, "totalLatencyMs": int(delay * 1000)},
+                "tokens": {"prompt": len(prompt) // 4, "candidates": size // 4, "total": (len(prompt) + size) // 4},
+            }}},
+        }))
+    else:
+        print(body)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Concurrent load generator that drives the bridge as an MCP server over stdio.
+
+Usage:
+  python benchmarks/load_stdio.py [--concurrency 8] [--requests 200 | --duration 30]
+                                  [--tool gemini_prompt] [--args '{"prompt": "hi"}'] [--out FILE]
+
+The server is started with fake_gemini.py first on PATH (FAKE_GEMINI_* env vars are
+passed through), so results measure bridge overhead plus the simulated model latency.
+Reports throughput, latency percentiles, error counts and server RSS as JSON. Errors are
+split into JSON-RPC errors, `isError` results, and bridge payloads that report
+`ok: false` / `rate_limited` / `timed_out`.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from _util import ROOT, emit, install_fake_gemini, percentiles, rss_kb  # noqa: E402
+
+PROTOCOL_VERSION = "2025-06-18"
+
+
+class StdioClient:
+    """Minimal newline-delimited JSON-RPC client with concurrent in-flight requests."""
+
+    def __init__(self, cmd: List[str], env: Dict[str, str]):
+        self.proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=env,
+            cwd=str(ROOT),
+            text=True,
+            bufsize=1,
+        )
+        self._write_lock = threading.Lock()
+        self._pending: Dict[int, Dict[str, object]] = {}
+        self._pending_lock = threading.Lock()
+        self._next_id = 0
+        threading.Thread(target=self._reader, daemon=True).start()
+
+    def _reader(self) -> None:
+        assert self.proc.stdout is not None
+        for line in self.proc.stdout:
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+            if "id" not in msg:
+                continue
+            with self._pending_lock:
+                slot = self._pending.pop(msg["id"], None)
+            if slot is not None:
+                slot["response"] = msg
+                slot["event"].set()  # type: ignore[union-attr]
+
+    def _send(self, payload: Dict[str, object]) -> None:
+        assert self.proc.stdin is not None
+        with self._write_lock:
+            self.proc.stdin.write(json.dumps(payload) + "\n")
+            self.proc.stdin.flush()
+
+    def request(self, method: str, params: Dict[str, object], timeout: float = 300.0) -> Dict[str, object]:
+        with self._pending_lock:
+            self._next_id += 1
+            rid = self._next_id
+            slot: Dict[str, object] = {"event": threading.Event(), "response": None}
+            self._pending[rid] = slot
+        self._send({"jsonrpc": "2.0", "id": rid, "method": method, "params": params})
+        if not slot["event"].wait(timeout):  # type: ignore[union-attr]
+            raise TimeoutError(f"{method} timed out after {timeout}s")
+        return slot["response"]  # type: ignore[return-value]
+
+    def notify(self, method: str) -> None:
+        self._send({"jsonrpc": "2.0", "method": method})
+
+    def close(self) -> None:
+        try:
+            if self.proc.stdin:
+                self.proc.stdin.close()
+            self.proc.wait(timeout=10)
+        except Exception:
+            self.proc.kill()
+
+
+def classify(resp: Dict[str, object]) -> Optional[str]:
+    """Error bucket for one tools/call response, or None when the call succeeded.
+
+    Besides JSON-RPC errors and `isError` results, the bridge reports tool-level failures
+    inside the text payload (`{"ok": false, ...}`), so that is parsed as well.
+    """
+    if "error" in resp:
+        return "rpc"
+    result = resp.get("result") or {}
+    if result.get("isError"):  # type: ignore[union-attr]
+        return "tool"
+    content = result.get("content") or []  # type: ignore[union-attr]
+    text = content[0].get("text") if content and isinstance(content[0], dict) else None
+    try:
+        payload = json.loads(text) if text else None
+    except ValueError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+    if payload.get("rate_limited"):
+        return "rate_limited"
+    if payload.get("timed_out"):
+        return "timed_out"
+    if payload.get("ok") is False:
+        return "failed"
+    return None
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--duration", type=float, default=0.0, help="seconds; overrides --requests when > 0")
+    ap.add_argument("--tool", default="gemini_prompt")
+    ap.add_argument("--args", default='{"prompt": "hello"}', help="JSON object of tool arguments")
+    ap.add_argument("--server", nargs=argparse.REMAINDER, default=None,
+                    help="server command (default: python -m gemini_cli_bridge)")
+    ap.add_argument("--out", default=None, help="also write the JSON result here")
+    args = ap.parse_args()
+
+    env = os.environ.copy()
+    env["PATH"] = install_fake_gemini() + os.pathsep + env.get("PATH", "")
+    cmd = args.server or [sys.executable, "-m", "gemini_cli_bridge"]
+    client = StdioClient(cmd, env)
+
+    t_start = time.perf_counter()
+    init = client.request("initialize", {
+        "protocolVersion": PROTOCOL_VERSION,
+        "capabilities": {},
+        "clientInfo": {"name": "gcb-load", "version": "0"},
+    }, timeout=60)
+    startup_ms = (time.perf_counter() - t_start) * 1000
+    if "error" in init:
+        raise SystemExit(f"initialize failed: {init['error']}")
+    client.notify("notifications/initialized")
+
+    tool_args = json.loads(args.args)
+    latencies: List[float] = []
+    # timeout: no response in time; the rest are buckets from classify()
+    errors = {"rpc": 0, "tool": 0, "failed": 0, "rate_limited": 0, "timed_out": 0, "timeout": 0}
+    lock = threading.Lock()
+    issued = [0]
+    deadline: Optional[float] = time.perf_counter() + args.duration if args.duration > 0 else None
+    rss_samples: List[int] = []
+    done = threading.Event()
+
+    def sample_rss() -> None:
+        while not done.wait(0.25):
+            kb = rss_kb(client.proc.pid)
+            if kb:
+                rss_samples.append(kb)
+
+    def worker() -> None:
+        while True:
+            with lock:
+                if deadline is None and issued[0] >= args.requests:
+                    return
+                issued[0] += 1
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            t0 = time.perf_counter()
+            try:
+                resp = client.request("tools/call", {"name": args.tool, "arguments": tool_args})
+            except TimeoutError:
+                with lock:
+                    errors["timeout"] += 1
+                continue
+            ms = (time.perf_counter() - t0) * 1000
+            with lock:
+                latencies.append(ms)
+                kind = classify(resp)
+                if kind:
+                    errors[kind] += 1
+
+    threading.Thread(target=sample_rss, daemon=True).start()
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(max(args.concurrency, 1))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    done.set()
+    final_rss = rss_kb(client.proc.pid)
+    client.close()
+
+    emit(
+        "load_stdio",
+        {
+            "tool": args.tool,
+            "concurrency": args.concurrency,
+            "requests": args.requests if deadline is None else None,
+            "duration_s": args.duration or None,
+            "fake_gemini": {k: v for k, v in os.environ.items() if k.startswith("FAKE_GEMINI_")},
+        },
+        {
+            "startup_ms": round(startup_ms, 3),
+            "completed": len(latencies),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed > 0 else 0.0,
+            "latency_ms": percentiles(latencies),
+            "errors": errors,
+            "server_rss_kb": {"max": max(rss_samples) if rss_samples else final_rss, "final": final_rss},
+        },
+        args.out,
+    )
+
+
+if __name__ == "__main__":
+    main()
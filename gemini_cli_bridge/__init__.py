@@ -0,0 +1,1712 @@
+# -*- coding: utf-8 -*-
+"""MCP bridge for the Gemini CLI plus system/web tools.
+
+This module holds everything a stdio server needs at startup: config, metrics, tool
+registration, the subprocess runner, the gemini scheduler and the gemini, bridge and
+shell tools. The files, web and search tool groups live in submodules of the same name,
+imported only when their group is enabled (see _TOOL_MODULES). Optional machinery lives
+in submodules that are imported on first use:
+
+- profiling: bridge_profile / GEMINI_BRIDGE_PROFILE*
+- ratelimit: GEMINI_BRIDGE_RATE_LIMITS
+- routing: hedging and quota fallback (GEMINI_BRIDGE_HEDGE_MODEL etc.)
+- metadata: cache behind gemini_version / gemini_extensions_list / gemini_mcp_list
+- sessions: gemini session_id turns; shell: named Shell sessions
+- transport: --transport http|sse
+
+Submodules read globals that tests or main() may rebind (mcp, _metrics, _usage, _is_private_url)
+through the package (`bridge.<name>`); shared singletons stay here behind _get_*().
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import bisect
+import contextlib
+import contextvars
+import functools
+import ipaddress
+import json
+import math
+import os
+import socket
+import subprocess
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+from fastmcp import FastMCP
+
+
+# ---- Constants and MCP initialization ---------------------------------------
+_DEFAULT_MAX_OUT = 200_000  # default truncation length
+_DEFAULT_MAX_CONCURRENCY = 4  # concurrent gemini subprocesses
+_USAGE_WINDOW = 200  # samples kept per model/tool for rolling summaries
+_LATENCY_BUCKETS_MS = (
+    1, 2.5, 5, 10, 25, 50, 100, 250, 500,
+    1_000, 2_500, 5_000, 10_000, 30_000, 60_000, 120_000, 300_000,
+)
+mcp = FastMCP("Gemini")
+
+
+# --- Config helpers -----------------------------------------------------------
+def _get_int_env(name: str, default: int) -> int:
+    try:
+        val = int(str(os.getenv(name, "")).strip())
+        if val > 0:
+            return val
+    except Exception:
+        pass
+    return int(default)
+
+
+def get_max_out() -> int:
+    """Return configured output truncation length.
+
+    Env: GEMINI_BRIDGE_MAX_OUT (int, >0). Default: _DEFAULT_MAX_OUT.
+    """
+    return _get_int_env("GEMINI_BRIDGE_MAX_OUT", _DEFAULT_MAX_OUT)
+
+
+def _truncate(s: Optional[str]) -> str:
+    """Truncate string to configured length with marker when needed."""
+    if s is None:
+        return ""
+    limit = get_max_out()
+    if len(s) <= limit:
+        return s
+    _metrics.incr("bytes_truncated", len(s) - limit)
+    return s[:limit] + "\n...[truncated]..."
+
+
+def _allowed_path_prefixes() -> tuple:
+    """Whitelist for extending PATH via env, safe-by-default.
+
+    - Defaults to common system prefixes.
+    - Can extend via GEMINI_BRIDGE_ALLOWED_PATH_PREFIXES (colon-separated).
+    """
+    defaults = [
+        "/opt/homebrew/bin",
+        "/usr/local/bin",
+        "/usr/bin",
+        "/bin",
+        "/sbin",
+    ]
+    extra = []
+    raw = os.getenv("GEMINI_BRIDGE_ALLOWED_PATH_PREFIXES", "").strip()
+    if raw:
+        for p in raw.split(":"):
+            p = p.strip()
+            if p and os.path.isabs(p):
+                extra.append(p)
+    # de-dup while preserving order
+    seen = set()
+    items = []
+    for p in [*defaults, *extra]:
+        if p not in seen:
+            seen.add(p)
+            items.append(p)
+    return tuple(items)
+
+
+def _unify_timeout(provided: Optional[int], default: int) -> int:
+    """Return final timeout: provided > env > default."""
+    if isinstance(provided, int) and provided > 0:
+        return provided
+    return _get_int_env("GEMINI_BRIDGE_DEFAULT_TIMEOUT_S", default)
+
+
+# --- Metrics -------------------------------------------------------------------
+class _Histogram:
+    """Fixed-bucket latency histogram (ms); quantiles are interpolated within buckets."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(_LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(_LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= target:
+                lower = _LATENCY_BUCKETS_MS[i - 1] if i > 0 else 0.0
+                upper = _LATENCY_BUCKETS_MS[i] if i < len(_LATENCY_BUCKETS_MS) else self.max
+                return round(min(lower + (upper - lower) * (target - seen) / n, self.max), 3)
+            seen += n
+        return round(self.max, 3)
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": round(self.max, 3),
+        }
+
+
+class _Metrics:
+    """Process-wide counters and latency histograms; cheap enough to leave on."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._tools: Dict[str, Dict[str, object]] = {}
+        self._counters: Dict[str, int] = {}
+        self._timings: Dict[str, _Histogram] = {}
+
+    def observe_call(self, tool: str, ms: float, *, error: bool = False, timeout: bool = False) -> None:
+        with self._lock:
+            entry = self._tools.get(tool)
+            if entry is None:
+                entry = self._tools[tool] = {"calls": 0, "errors": 0, "timeouts": 0, "latency": _Histogram()}
+            entry["calls"] += 1
+            entry["errors"] += int(error)
+            entry["timeouts"] += int(timeout)
+            entry["latency"].observe(ms)
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def observe(self, name: str, ms: float) -> None:
+        with self._lock:
+            hist = self._timings.get(name)
+            if hist is None:
+                hist = self._timings[name] = _Histogram()
+            hist.observe(ms)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "uptime_s": round(time.time() - self._started, 3),
+                "tools": {
+                    name: {
+                        "calls": e["calls"],
+                        "errors": e["errors"],
+                        "timeouts": e["timeouts"],
+                        "latency_ms": e["latency"].summary(),
+                    }
+                    for name, e in sorted(self._tools.items())
+                },
+                "counters": dict(sorted(self._counters.items())),
+                "timings_ms": {name: h.summary() for name, h in sorted(self._timings.items())},
+            }
+
+    def prometheus(self) -> str:
+        """Render metrics in the Prometheus text exposition format."""
+        def hist_lines(metric: str, labels: str, h: _Histogram) -> List[str]:
+            out = []
+            cumulative = 0
+            for bound, n in zip(_LATENCY_BUCKETS_MS, h.counts):
+                cumulative += n
+                out.append(f'{metric}_bucket{{{labels},le="{bound / 1000:g}"}} {cumulative}')
+            out.append(f'{metric}_bucket{{{labels},le="+Inf"}} {h.count}')
+            out.append(f"{metric}_sum{{{labels}}} {h.total / 1000:.6f}")
+            out.append(f"{metric}_count{{{labels}}} {h.count}")
+            return out
+
+        with self._lock:
+            lines = [
+                "# TYPE gemini_bridge_uptime_seconds gauge",
+                f"gemini_bridge_uptime_seconds {time.time() - self._started:.3f}",
+            ]
+            for field in ("calls", "errors", "timeouts"):
+                lines.append(f"# TYPE gemini_bridge_tool_{field}_total counter")
+                for name, e in sorted(self._tools.items()):
+                    lines.append(f'gemini_bridge_tool_{field}_total{{tool="{name}"}} {e[field]}')
+            lines.append("# TYPE gemini_bridge_tool_latency_seconds histogram")
+            for name, e in sorted(self._tools.items()):
+                lines += hist_lines("gemini_bridge_tool_latency_seconds", f'tool="{name}"', e["latency"])
+            lines.append("# TYPE gemini_bridge_events_total counter")
+            for name, n in sorted(self._counters.items()):
+                lines.append(f'gemini_bridge_events_total{{event="{name}"}} {n}')
+            lines.append("# TYPE gemini_bridge_timing_seconds histogram")
+            for name, h in sorted(self._timings.items()):
+                lines += hist_lines("gemini_bridge_timing_seconds", f'name="{name}"', h)
+        return "\n".join(lines) + "\n"
+
+
+_metrics = _Metrics()
+# Per-call state of the tool currently executing (set by _instrumented)
+_current_call: contextvars.ContextVar[Optional[Dict[str, object]]] = contextvars.ContextVar(
+    "gemini_bridge_current_call", default=None
+)
+
+
+def _mark_call(*, error: bool = False, timeout: bool = False) -> None:
+    """Flag the current tool call as failed/timed out without raising."""
+    state = _current_call.get()
+    if state is not None:
+        state["error"] = state.get("error") or error
+        state["timeout"] = state.get("timeout") or timeout
+
+
+def _instrumented(fn):
+    """Record call count, errors, timeouts and latency for a tool function."""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        state: Dict[str, object] = {"tool": name, "error": False, "timeout": False}
+        token = _current_call.set(state)
+        t0 = time.perf_counter()
+        try:
+            profiler = _profiler if _profiler is not None else _get_profiler() if _profiling_requested() else None
+            if profiler is not None and profiler.claim(name):
+                return profiler.call(name, fn, args, kwargs)
+            return fn(*args, **kwargs)
+        except subprocess.TimeoutExpired:
+            state["timeout"] = True
+            raise
+        except Exception:
+            state["error"] = True
+            raise
+        finally:
+            _current_call.reset(token)
+            _metrics.observe_call(
+                name,
+                (time.perf_counter() - t0) * 1000,
+                error=bool(state["error"]),
+                timeout=bool(state["timeout"]),
+            )
+
+    return wrapper
+
+
+# --- Profiling -----------------------------------------------------------------
+_profiler = None  # profiling._Profiler, created by _get_profiler()
+_profiler_lock = threading.Lock()
+
+
+def _get_profiler():
+    """Return the shared profiler (gemini_cli_bridge.profiling is imported on first use)."""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            from .profiling import _Profiler  # keep import local: profiling is opt-in
+            _profiler = _Profiler()
+        return _profiler
+
+
+def _profiling_requested() -> bool:
+    """Whether tool calls must consult the profiler before bridge_profile ever ran."""
+    return bool(os.getenv("GEMINI_BRIDGE_PROFILE") or os.getenv("GEMINI_BRIDGE_PROFILE_SECONDS"))
+
+
+_tool_executor_lock = threading.Lock()
+_tool_executor = None
+_session_gates: Dict[str, object] = {}
+_draining = threading.Event()  # set on shutdown: refuse new calls, let in-flight ones finish
+_inflight_lock = threading.Lock()
+_inflight_calls = 0
+
+
+def _get_tool_executor():
+    """Shared worker pool for tool calls. Env: GEMINI_BRIDGE_TOOL_THREADS (default 32)."""
+    global _tool_executor
+    with _tool_executor_lock:
+        if _tool_executor is None:
+            from concurrent.futures import ThreadPoolExecutor  # keep import local
+            _tool_executor = ThreadPoolExecutor(
+                max_workers=_get_int_env("GEMINI_BRIDGE_TOOL_THREADS", 32),
+                thread_name_prefix="gcb-tool",
+            )
+        return _tool_executor
+
+
+def _request_session_id() -> str:
+    """MCP session id of the current request, or "local" (stdio/tests).
+
+    Network transports depend on Context.session_id (fastmcp>=2.9); main() refuses to
+    start them without it.
+    """
+    try:
+        from fastmcp.server.dependencies import get_context  # fastmcp>=2
+    except ImportError:
+        return "local"
+    try:
+        ctx = get_context()
+    except RuntimeError:  # no active request context (direct in-process call)
+        return "local"
+    return str(getattr(ctx, "session_id", None) or "local")
+
+
+def _session_gate(session: str):
+    """Per-session cap on in-flight tool calls. Env: GEMINI_BRIDGE_SESSION_MAX_CALLS (default 8)."""
+    import asyncio  # keep import local
+    gate = _session_gates.get(session)
+    if gate is None:
+        if len(_session_gates) > 1024:  # forget idle sessions
+            for key in [k for k, g in _session_gates.items() if not g.locked()]:
+                del _session_gates[key]
+        gate = _session_gates[session] = asyncio.Semaphore(_get_int_env("GEMINI_BRIDGE_SESSION_MAX_CALLS", 8))
+    return gate
+
+
+def _async_adapter(fn):
+    """Expose a sync tool to the MCP server as a coroutine running on the worker pool.
+
+    Keeps the event loop free so concurrent requests (and clients) don't serialize;
+    cancelling the coroutine signals the call's cancel event (see _run).
+    """
+    @functools.wraps(fn)
+    async def runner(*args, **kwargs):
+        import asyncio  # keep import local
+        global _inflight_calls
+        if _draining.is_set():
+            raise RuntimeError("gemini-cli-bridge is shutting down")
+        session = _request_session_id()
+        cancel = threading.Event()
+        ctx = contextvars.copy_context()
+        ctx.run(_current_session.set, session)
+        ctx.run(_cancel_event.set, cancel)
+
+        def call():
+            global _inflight_calls
+            try:
+                return ctx.run(fn, *args, **kwargs)
+            finally:
+                # Counted until the worker really finishes, even if the request was cancelled
+                with _inflight_lock:
+                    _inflight_calls -= 1
+
+        async with _session_gate(session):
+            with _inflight_lock:
+                _inflight_calls += 1
+            future = _get_tool_executor().submit(call)
+            try:
+                return await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                # MCP cancellation: the worker's _run reaps its process group and returns early
+                cancel.set()
+                if future.cancel():  # never started, so call() won't decrement
+                    with _inflight_lock:
+                        _inflight_calls -= 1
+                raise
+
+    return runner
+
+
+def _wait_inflight(timeout_s: float) -> bool:
+    """Block until no tool call is in flight (True) or timeout_s elapses (False)."""
+    deadline = time.monotonic() + max(timeout_s, 0)
+    while True:
+        with _inflight_lock:
+            if _inflight_calls <= 0:
+                return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+
+
+_TOOL_GROUPS = ("gemini", "gemini_admin", "bridge", "shell", "files", "web", "search")
+_tool_groups: Dict[str, Dict[str, object]] = {}
+
+
+def _tool_group_enabled(group: str) -> bool:
+    """Whether a tool group is advertised.
+
+    Env: GEMINI_BRIDGE_TOOL_GROUPS (comma-separated groups to enable; default all) and
+    GEMINI_BRIDGE_DISABLE_TOOL_GROUPS (groups to drop). Read once, at import.
+    """
+    def groups(name: str) -> set:
+        return {g.strip().lower() for g in os.getenv(name, "").split(",") if g.strip()}
+
+    enabled = groups("GEMINI_BRIDGE_TOOL_GROUPS")
+    return (not enabled or "all" in enabled or group in enabled) and group not in groups(
+        "GEMINI_BRIDGE_DISABLE_TOOL_GROUPS"
+    )
+
+
+def _tool(group: str):
+    """Register an instrumented MCP tool in `group`; use in place of `@mcp.tool()`.
+
+    The module keeps the sync function (direct calls and tests); the server gets an
+    async adapter that runs it on the shared worker pool. Tools of a disabled group are
+    not registered, so they are never advertised and their lazily imported dependencies
+    are never loaded.
+    """
+    entry = _tool_groups.setdefault(group, {"enabled": _tool_group_enabled(group), "tools": []})
+
+    def _decorator(fn):
+        wrapped = _instrumented(fn)
+        if fn.__name__ not in entry["tools"]:  # pre-listed by _load_tool_modules when disabled
+            entry["tools"].append(fn.__name__)
+        if entry["enabled"]:
+            mcp.tool()(_async_adapter(wrapped))  # important: decorator requires parentheses
+        return wrapped
+    return _decorator
+
+
+def _start_metrics_exporters() -> None:
+    """Optionally expose Prometheus text on a local port and/or a file.
+
+    Env: GEMINI_BRIDGE_METRICS_PORT (serve /metrics on GEMINI_BRIDGE_METRICS_HOST,
+    default 127.0.0.1), GEMINI_BRIDGE_METRICS_FILE (rewritten every
+    GEMINI_BRIDGE_METRICS_INTERVAL_S seconds, default 15).
+    """
+    port = _get_int_env("GEMINI_BRIDGE_METRICS_PORT", 0)
+    if port:
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # keep import local
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # noqa: N802 (http.server API)
+                if self.path.split("?", 1)[0] not in {"/metrics", "/"}:
+                    self.send_error(404)
+                    return
+                body = _metrics.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):  # keep STDIO transport clean
+                pass
+
+        host = os.getenv("GEMINI_BRIDGE_METRICS_HOST", "127.0.0.1").strip() or "127.0.0.1"
+        server = ThreadingHTTPServer((host, port), _Handler)
+        threading.Thread(target=server.serve_forever, name="gcb-metrics-http", daemon=True).start()
+
+    path = os.getenv("GEMINI_BRIDGE_METRICS_FILE", "").strip()
+    if path:
+        interval = _get_int_env("GEMINI_BRIDGE_METRICS_INTERVAL_S", 15)
+        target = Path(path).expanduser()
+
+        def _writer():
+            while True:
+                try:
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    tmp = target.with_name(target.name + ".tmp")
+                    tmp.write_text(_metrics.prometheus(), encoding="utf-8")
+                    os.replace(tmp, target)
+                except Exception:
+                    pass
+                time.sleep(interval)
+
+        threading.Thread(target=_writer, name="gcb-metrics-file", daemon=True).start()
+
+
+@_tool("gemini")
+def gemini_prompt(
+    prompt: str,
+    model: str = "gemini-2.5-pro",
+    include_dirs: Optional[List[str]] = None,
+    timeout_s: Optional[int] = None,
+    extra_args: Optional[List[str]] = None,
+) -> str:
+    """Run local `gemini` CLI non-interactively; return structured JSON."""
+    cmd = ["gemini", "-m", model, "-p", prompt]
+    if include_dirs:
+        cmd += ["--include-directories", ",".join(include_dirs)]
+    if extra_args:
+        for a in extra_args:
+            if isinstance(a, str) and a.startswith("-"):
+                cmd.append(a)
+    return _run_gemini_and_format_output(cmd, timeout_s=timeout_s, tool="gemini_prompt")
+
+
+# --- Helpers -----------------------------------------------------------------
+def _env_with_path(extra_env: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    env = os.environ.copy()
+    # Disable colors for easier client parsing
+    env["NO_COLOR"] = "1"
+    base_path = env.get("PATH", "")
+    # default safe additions
+    base_path = base_path + ":/opt/homebrew/bin:/usr/local/bin:/usr/bin:/bin"
+
+    # Optional: allow extending PATH via a safe whitelist
+    extras_raw = os.getenv("GEMINI_BRIDGE_EXTRA_PATHS", "").strip()
+    if extras_raw:
+        allowed = _allowed_path_prefixes()
+        extras: List[str] = []
+        for p in extras_raw.split(":"):
+            p = p.strip()
+            if not p:
+                continue
+            try:
+                rp = os.path.realpath(p)
+                if os.path.isabs(rp) and any(rp.startswith(pref) for pref in allowed) and os.path.isdir(rp):
+                    extras.append(rp)
+            except Exception:
+                continue
+        if extras:
+            base_path = base_path + ":" + ":".join(extras)
+    env["PATH"] = base_path
+    if extra_env:
+        for k, v in extra_env.items():
+            if not (isinstance(k, str) and isinstance(v, str)):
+                continue
+            if k.upper() == "PATH":
+                # Safety: do not allow overriding PATH
+                continue
+            env[k] = v
+    return env
+
+
+# In-flight child processes, drained on shutdown (see _drain_children)
+_children_lock = threading.Lock()
+_children: set = set()
+# Cancellation flag of the tool call running in this context (set by _async_adapter)
+_cancel_event: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar(
+    "gemini_bridge_cancel", default=None
+)
+_POLL_S = 0.25  # how often a waiting _run checks for cancellation
+
+
+def _kill_grace_s() -> int:
+    """Seconds between SIGTERM and SIGKILL. Env: GEMINI_BRIDGE_KILL_GRACE_S (default 3)."""
+    return _get_int_env("GEMINI_BRIDGE_KILL_GRACE_S", 3)
+
+
+def _group_alive(pgid: int) -> bool:
+    try:
+        os.killpg(pgid, 0)
+        return True
+    except (ProcessLookupError, PermissionError, OSError):
+        return False
+
+
+def _terminate_group(proc: subprocess.Popen, grace_s: float) -> None:
+    """SIGTERM the child's whole process group, escalating to SIGKILL after grace_s."""
+    if os.name != "posix":
+        with contextlib.suppress(Exception):
+            proc.kill()
+        return
+    import signal  # keep import local
+
+    with contextlib.suppress(ProcessLookupError, PermissionError, OSError):
+        os.killpg(proc.pid, signal.SIGTERM)
+    with contextlib.suppress(subprocess.TimeoutExpired):
+        proc.wait(timeout=grace_s)
+    # Descendants may outlive (or ignore) SIGTERM once the leader is gone
+    with contextlib.suppress(ProcessLookupError, PermissionError, OSError):
+        os.killpg(proc.pid, signal.SIGKILL)
+    _metrics.incr("subprocess_reaped")
+
+
+def _reap_leftovers(proc: subprocess.Popen) -> None:
+    """Kill descendants still running in the group after the leader exited."""
+    if os.name == "posix" and _group_alive(proc.pid):
+        _metrics.incr("subprocess_orphaned")
+        _terminate_group(proc, 0)
+
+
+def _drain_children(timeout_s: float) -> int:
+    """Wait up to timeout_s for in-flight subprocesses, then kill the rest; return how many were killed."""
+    deadline = time.monotonic() + max(timeout_s, 0)
+    while time.monotonic() < deadline:
+        with _children_lock:
+            if not _children:
+                return 0
+        time.sleep(0.05)
+    with _children_lock:
+        leftover = [p for p in _children if p.poll() is None]
+    for proc in leftover:
+        _terminate_group(proc, min(_kill_grace_s(), 1))
+    return len(leftover)
+
+
+def _decode_partial(data) -> str:
+    if data is None:
+        return ""
+    if isinstance(data, bytes):
+        return data.decode("utf-8", errors="ignore")
+    return str(data)
+
+
+def _cancelled_before_start(cmd: List[str]) -> Dict[str, object]:
+    """`_run`-shaped result for a command whose call was cancelled before it spawned."""
+    _metrics.incr("subprocess_cancelled")
+    return {
+        "cmd": cmd, "exit_code": 130, "stdout": "", "stderr": "cancelled before start",
+        "timed_out": False, "cancelled": True,
+        "timing": {"spawn_ms": 0.0, "wall_ms": 0.0}, "bytes_out": 0,
+    }
+
+
+def _run(
+    cmd: List[str],
+    timeout_s: Optional[int] = None,
+    *,
+    env: Optional[Dict[str, str]] = None,
+    cwd: Optional[str] = None,
+    raise_on_error: bool = True,
+    cancel: Optional[threading.Event] = None,
+    reap_on_exit: bool = True,
+) -> Dict[str, object]:
+    """Run subprocess in its own process group and return structured result.
+    Returns: {cmd: [...], exit_code: int, stdout: str, stderr: str, timed_out: bool,
+    cancelled: bool, timing: {...}, bytes_out: int}.
+
+    On timeout or cancellation (`cancel`, default: the current tool call's event) the
+    whole group gets SIGTERM then SIGKILL; output captured so far is returned with
+    exit_code 124 (timeout) or 130 (cancelled). reap_on_exit also kills descendants
+    left running after a normal exit.
+    When raise_on_error is True, raises RuntimeError on non-zero exit and
+    subprocess.TimeoutExpired on timeout.
+    """
+    to = _unify_timeout(timeout_s, default=120)
+    cancel = cancel if cancel is not None else _cancel_event.get()
+    full_env = _env_with_path(env)
+    if cancel is not None and cancel.is_set():
+        return _cancelled_before_start(cmd)
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        env=full_env,
+        cwd=cwd,
+        start_new_session=(os.name == "posix"),
+    )
+    t_spawned = time.perf_counter()
+    _metrics.incr("subprocess_spawned")
+    with _children_lock:
+        _children.add(proc)
+    timed_out = cancelled = False
+    deadline = time.monotonic() + to
+    try:
+        while True:
+            remaining = max(deadline - time.monotonic(), 0)
+            try:
+                stdout, stderr = proc.communicate(timeout=min(remaining, _POLL_S) if cancel is not None else remaining)
+                break
+            except subprocess.TimeoutExpired:
+                if cancel is not None and cancel.is_set():
+                    cancelled = True
+                elif time.monotonic() >= deadline:
+                    timed_out = True
+                else:
+                    continue
+            # Timed out or cancelled: stop the whole group, keep what was captured
+            grace = _kill_grace_s()
+            _terminate_group(proc, grace)
+            try:
+                stdout, stderr = proc.communicate(timeout=grace)
+            except subprocess.TimeoutExpired as e:
+                # Pipes held open by processes that escaped the group
+                _metrics.incr("subprocess_orphaned")
+                stdout, stderr = _decode_partial(e.output), _decode_partial(e.stderr)
+                for pipe in (proc.stdout, proc.stderr):
+                    with contextlib.suppress(Exception):
+                        pipe.close()
+            _metrics.incr("subprocess_timeouts" if timed_out else "subprocess_cancelled")
+            break
+        if reap_on_exit and not (timed_out or cancelled):
+            _reap_leftovers(proc)
+    finally:
+        with _children_lock:
+            _children.discard(proc)
+    t_done = time.perf_counter()
+    bytes_out = len((stdout or "").encode("utf-8", "ignore")) + len((stderr or "").encode("utf-8", "ignore"))
+    out = _truncate(stdout)
+    err = _truncate(stderr)
+    if raise_on_error and timed_out:
+        raise subprocess.TimeoutExpired(cmd, to, output=out, stderr=err)
+    exit_code = 124 if timed_out else 130 if cancelled else proc.returncode
+    if raise_on_error and exit_code != 0:
+        raise RuntimeError(err.strip() or f"command exit {exit_code}: {' '.join(cmd)}")
+    return {
+        "cmd": cmd,
+        "exit_code": exit_code,
+        "stdout": out,
+        "stderr": err,
+        "timed_out": timed_out,
+        "cancelled": cancelled,
+        "timing": {
+            "spawn_ms": round((t_spawned - t0) * 1000, 3),
+            "wall_ms": round((t_done - t0) * 1000, 3),
+        },
+        "bytes_out": bytes_out,
+    }
+
+
+# --- Gemini usage stats ---------------------------------------------------------
+_TOKEN_FIELDS = ("prompt", "candidates", "total", "cached", "thoughts", "tool")
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class _UsageStats:
+    """Rolling window of gemini CLI runs, aggregated per model and per tool."""
+
+    def __init__(self, window: int = _USAGE_WINDOW):
+        self._window = window
+        self._lock = threading.Lock()
+        self._by_model: Dict[str, deque] = {}
+        self._by_tool: Dict[str, deque] = {}
+
+    def record(self, model: str, tool: Optional[str], sample: Dict[str, object]) -> None:
+        """Add a run to the model's window (and the tool's, unless tool is None)."""
+        with self._lock:
+            for table, key in ((self._by_model, model), (self._by_tool, tool)):
+                if key is None:
+                    continue
+                bucket = table.get(key)
+                if bucket is None:
+                    bucket = table[key] = deque(maxlen=self._window)
+                bucket.append(sample)
+
+    def latencies(self, model: str) -> List[float]:
+        """Return recent wall-clock latencies (ms) of successful runs of a model."""
+        with self._lock:
+            return [float(s.get("wall_ms") or 0.0) for s in self._by_model.get(model, ()) if s.get("ok")]
+
+    @staticmethod
+    def _summarize(samples: List[Dict[str, object]]) -> Dict[str, object]:
+        walls = [float(s.get("wall_ms") or 0.0) for s in samples]
+        tokens: Dict[str, int] = {}
+        for s in samples:
+            usage = s.get("usage") or {}
+            for f in _TOKEN_FIELDS:
+                if isinstance(usage.get(f), int):
+                    tokens[f] = tokens.get(f, 0) + usage[f]
+        return {
+            "count": len(samples),
+            "errors": sum(1 for s in samples if not s.get("ok")),
+            "wall_ms": {
+                "avg": round(sum(walls) / len(walls), 3) if walls else 0.0,
+                "p50": _percentile(walls, 50),
+                "p95": _percentile(walls, 95),
+                "max": max(walls) if walls else 0.0,
+            },
+            "queue_ms_avg": round(sum(float(s.get("queue_ms") or 0.0) for s in samples) / len(samples), 3) if samples else 0.0,
+            "bytes_in": sum(int(s.get("bytes_in") or 0) for s in samples),
+            "bytes_out": sum(int(s.get("bytes_out") or 0) for s in samples),
+            "tokens": tokens,
+        }
+
+    def summary(self) -> Dict[str, object]:
+        with self._lock:
+            by_model = {k: list(v) for k, v in self._by_model.items()}
+            by_tool = {k: list(v) for k, v in self._by_tool.items()}
+        return {
+            "window": self._window,
+            "by_model": {k: self._summarize(v) for k, v in sorted(by_model.items())},
+            "by_tool": {k: self._summarize(v) for k, v in sorted(by_tool.items())},
+        }
+
+
+_usage = _UsageStats()
+
+
+# --- Scheduling ----------------------------------------------------------------
+class _FairScheduler:
+    """Process-wide cap on concurrent gemini subprocesses, fair across client sessions.
+
+    A freed slot goes to the waiting session with the fewest active runs (ties: oldest
+    request), and no session may hold more than `per_session` slots, so one slow
+    client cannot starve the others on a shared bridge.
+    """
+
+    def __init__(self, capacity: int, per_session: Optional[int] = None):
+        self.capacity = max(int(capacity), 1)
+        self.per_session = max(min(int(per_session or self.capacity), self.capacity), 1)
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._active_total = 0
+        self._active: Dict[str, int] = {}
+        self._waiting: Dict[str, deque] = {}
+
+    def _next_session(self) -> Optional[str]:
+        best = None
+        for session, queue in self._waiting.items():
+            active = self._active.get(session, 0)
+            if not queue or active >= self.per_session:
+                continue
+            key = (active, queue[0])
+            if best is None or key < best[0]:
+                best = (key, session)
+        return best[1] if best else None
+
+    def acquire(self, session: str, cancel: Optional[threading.Event] = None) -> bool:
+        """Wait for a slot; False (nothing taken) once `cancel` is set while queued."""
+        with self._cond:
+            self._seq += 1
+            ticket = self._seq
+            queue = self._waiting.setdefault(session, deque())
+            queue.append(ticket)
+            while not (
+                self._active_total < self.capacity
+                and queue[0] == ticket
+                and self._next_session() == session
+            ):
+                if cancel is not None and cancel.is_set():
+                    queue.remove(ticket)
+                    if not queue:
+                        del self._waiting[session]
+                    self._cond.notify_all()  # this ticket may have been blocking others
+                    return False
+                self._cond.wait(_POLL_S if cancel is not None else None)
+            queue.popleft()
+            if not queue:
+                del self._waiting[session]
+            self._active_total += 1
+            self._active[session] = self._active.get(session, 0) + 1
+            # waiters passed over for this session re-check: another slot may still be free
+            self._cond.notify_all()
+            return True
+
+    def release(self, session: str) -> None:
+        with self._cond:
+            self._active_total -= 1
+            left = self._active.get(session, 1) - 1
+            if left > 0:
+                self._active[session] = left
+            else:
+                self._active.pop(session, None)
+            self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self, session: str):
+        self.acquire(session)
+        try:
+            yield
+        finally:
+            self.release(session)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._cond:
+            return {
+                "capacity": self.capacity,
+                "per_session": self.per_session,
+                "active": self._active_total,
+                "waiting": sum(len(q) for q in self._waiting.values()),
+                "sessions": {
+                    s: {"active": self._active.get(s, 0), "waiting": len(self._waiting.get(s, ()))}
+                    for s in sorted(set(self._active) | set(self._waiting))
+                },
+            }
+
+
+_scheduler_lock = threading.Lock()
+_scheduler: Optional[_FairScheduler] = None
+# Client session of the tool call running in this context ("local" outside a server request)
+_current_session: contextvars.ContextVar[str] = contextvars.ContextVar("gemini_bridge_session", default="local")
+
+
+def _get_scheduler() -> _FairScheduler:
+    """Return the shared gemini scheduler.
+
+    Env: GEMINI_BRIDGE_MAX_CONCURRENCY (int, >0; default _DEFAULT_MAX_CONCURRENCY) and
+    GEMINI_BRIDGE_SESSION_MAX_CONCURRENCY (per-session share; default: all slots).
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            capacity = _get_int_env("GEMINI_BRIDGE_MAX_CONCURRENCY", _DEFAULT_MAX_CONCURRENCY)
+            _scheduler = _FairScheduler(
+                capacity, _get_int_env("GEMINI_BRIDGE_SESSION_MAX_CONCURRENCY", capacity)
+            )
+        return _scheduler
+
+
+# --- Rate limiting -------------------------------------------------------------
+class _RateLimited(Exception):
+    """A rate-limit bucket is empty (fail-fast) or would not free up within the wait budget."""
+
+    def __init__(self, key: str, retry_after_s: float):
+        super().__init__(f"rate limited: {key} (retry after {retry_after_s:.1f}s)")
+        self.key = key
+        self.retry_after_s = retry_after_s
+
+
+_rate_limiter_lock = threading.Lock()
+_rate_limiter = None  # ratelimit._RateLimiter, created by _get_rate_limiter()
+
+
+def _get_rate_limiter():
+    """Return the shared rate limiter (gemini_cli_bridge.ratelimit is imported on first use).
+
+    Env: GEMINI_BRIDGE_RATE_LIMITS (JSON, e.g. {"gemini:gemini-2.5-pro": {"rpm": 5,
+    "concurrency": 2}, "gcs": 100, "webfetch:*": {"rpm": 60}}), GEMINI_BRIDGE_RATE_LIMIT_MODE
+    (wait|fail; default wait), GEMINI_BRIDGE_RATE_LIMIT_MAX_WAIT_S (default 60) and
+    GEMINI_BRIDGE_RATE_LIMIT_STATE (state file; default under ~/.cache, "none" disables).
+    """
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            from .ratelimit import _limiter_from_env  # keep import local
+            _rate_limiter = _limiter_from_env()
+        return _rate_limiter
+
+
+@contextlib.contextmanager
+def _rate_limit(*keys: str, cancel: Optional[threading.Event] = None):
+    """Hold a token and slot from each limited bucket in keys; raises _RateLimited.
+
+    Without GEMINI_BRIDGE_RATE_LIMITS (and no limiter created yet) this is a no-op that
+    does not import the limiter.
+    """
+    if _rate_limiter is None and not os.getenv("GEMINI_BRIDGE_RATE_LIMITS", "").strip():
+        yield
+        return
+    with _get_rate_limiter().limit(*keys, cancel=cancel):
+        yield
+
+
+def _rate_limited_fields(e: _RateLimited) -> Dict[str, object]:
+    return {"rate_limited": True, "retry_after_s": round(e.retry_after_s, 3)}
+
+
+def _cmd_option(cmd: List[str], flag: str) -> Optional[str]:
+    """Return the value following `flag` in cmd (None if absent)."""
+    try:
+        i = cmd.index(flag)
+    except ValueError:
+        return None
+    return cmd[i + 1] if i + 1 < len(cmd) else None
+
+
+def _wants_cli_json(cmd: List[str], force: bool = False) -> bool:
+    """Whether to request the CLI's JSON output mode for this command.
+
+    Env: GEMINI_BRIDGE_CLI_JSON=1 enables it for prompt runs (`-p`); `force` enables it
+    for one run. Off by default because older gemini CLI releases reject `--output-format`.
+    """
+    if (not force and os.getenv("GEMINI_BRIDGE_CLI_JSON", "0") != "1") or "-p" not in cmd:
+        return False
+    return not any(a == "--output-format" or a.startswith("--output-format=") for a in cmd)
+
+
+def _parse_cli_json(stdout: str) -> Optional[Dict[str, object]]:
+    """Parse `gemini --output-format json` output into {response, usage, models, error, session_id}.
+
+    Returns None when stdout is not the CLI's JSON envelope.
+    """
+    text = (stdout or "").strip()
+    if not text.startswith("{"):
+        return None
+    try:
+        data = json.loads(text)
+    except Exception:
+        return None
+    if not isinstance(data, dict) or not ("response" in data or "stats" in data):
+        return None
+    models = ((data.get("stats") or {}).get("models") or {}) if isinstance(data.get("stats"), dict) else {}
+    usage: Dict[str, int] = {}
+    for m in models.values():
+        toks = (m or {}).get("tokens") or {}
+        for f in _TOKEN_FIELDS:
+            if isinstance(toks.get(f), int):
+                usage[f] = usage.get(f, 0) + toks[f]
+    return {
+        "response": data.get("response"),
+        "usage": usage or None,
+        "models": sorted(models.keys()),
+        "error": data.get("error"),
+        "session_id": data.get("session_id") or data.get("sessionId"),
+    }
+
+
+# --- Model routing --------------------------------------------------------------
+_ROUTING_ENV = ("GEMINI_BRIDGE_HEDGE_MODEL", "GEMINI_BRIDGE_FALLBACK_MODELS", "GEMINI_BRIDGE_ROUTING")
+
+
+def _routing_configured() -> bool:
+    """Cheap check before importing gemini_cli_bridge.routing: is any routing env var set?"""
+    return any(os.getenv(name, "").strip() for name in _ROUTING_ENV)
+
+
+def _run_gemini_once(
+    cmd: List[str],
+    timeout_s: Optional[int] = None,
+    cancel: Optional[threading.Event] = None,
+) -> Dict[str, object]:
+    """Run one gemini subprocess inside a scheduler slot; adds `queue_ms` to the result.
+
+    Prompt runs first pass the "gemini" and "gemini:<model>" rate-limit buckets (time
+    spent waiting there counts as queue time); a refusal comes back as a failed run
+    with `rate_limited`/`retry_after_s` set.
+    """
+    scheduler = _get_scheduler()
+    session = _current_session.get()
+    cancel = cancel if cancel is not None else _cancel_event.get()
+    t_queued = time.perf_counter()
+    keys = ["gemini", f"gemini:{_cmd_option(cmd, '-m') or 'default'}"] if "-p" in cmd else []
+    try:
+        with _rate_limit(*keys, cancel=cancel):
+            if not scheduler.acquire(session, cancel):
+                return {**_cancelled_before_start(cmd), "queue_ms": round((time.perf_counter() - t_queued) * 1000, 3)}
+            queue_ms = round((time.perf_counter() - t_queued) * 1000, 3)
+            try:
+                res = _run(cmd, timeout_s=timeout_s, raise_on_error=False, cancel=cancel)
+            finally:
+                scheduler.release(session)
+    except _RateLimited as e:
+        return {
+            "cmd": cmd,
+            "exit_code": None,
+            "stdout": "",
+            "stderr": str(e),
+            **_rate_limited_fields(e),
+            "queue_ms": round((time.perf_counter() - t_queued) * 1000, 3),
+        }
+    return {**res, "queue_ms": queue_ms}
+
+
+def _run_gemini_and_format_output(
+    cmd: List[str],
+    timeout_s: Optional[int] = None,
+    *,
+    tool: Optional[str] = None,
+    cli_json: bool = False,
+) -> str:
+    """Runs a gemini command and returns the standardized JSON response.
+
+    Adds `stats` (timings, bytes, prompt size, token usage when the CLI reports it)
+    and feeds the rolling per-model/per-tool summary (see gemini_usage_stats). When a
+    routing policy applies (see routing._routing_policy), `stats.model` is the model that
+    actually answered and `stats.routing` lists every attempt.
+    """
+    injected_json = _wants_cli_json(cmd, force=cli_json)
+    if injected_json:
+        cmd = [*cmd, "--output-format", "json"]
+    model = _cmd_option(cmd, "-m") or "default"
+    prompt = _cmd_option(cmd, "-p") or ""
+
+    policy = None
+    if "-p" in cmd and "-m" in cmd and _routing_configured():
+        from .routing import _routing_policy, _run_routed  # keep import local
+        policy = _routing_policy(tool)
+    routing: Optional[Dict[str, object]] = None
+    if policy is not None:
+        model, res, routing = _run_routed(cmd, model, policy, timeout_s)
+    else:
+        res = _run_gemini_once(cmd, timeout_s)
+
+    ok = res.get("exit_code", 1) == 0
+    timed_out = bool(res.get("timed_out"))
+    stdout = str(res.get("stdout", "")).strip()
+    parsed = _parse_cli_json(stdout)
+    if parsed and injected_json and isinstance(parsed.get("response"), str):
+        stdout = parsed["response"].strip()
+    timing = res.get("timing") or {}
+    stats: Dict[str, object] = {
+        "model": model,
+        "models_used": (parsed or {}).get("models") or [],
+        "wall_ms": timing.get("wall_ms"),
+        "spawn_ms": timing.get("spawn_ms"),
+        "queue_ms": res.get("queue_ms"),
+        "bytes_in": sum(len(str(a).encode("utf-8", "ignore")) for a in cmd),
+        "bytes_out": res.get("bytes_out"),
+        "prompt_chars": len(prompt),
+        "prompt_bytes": len(prompt.encode("utf-8", "ignore")),
+        "usage": (parsed or {}).get("usage"),
+    }
+    if routing is not None:
+        stats["routing"] = routing
+    if (parsed or {}).get("session_id"):
+        stats["cli_session_id"] = parsed["session_id"]
+    _usage.record(model, tool or "gemini", {"ok": ok, **stats})
+    if not ok:
+        _mark_call(error=not timed_out, timeout=timed_out)
+    payload: Dict[str, object] = {
+        "ok": ok,
+        "exit_code": res.get("exit_code"),
+        "stdout": stdout,
+        "stderr": str(res.get("stderr", "")).strip(),
+        "stats": stats,
+    }
+    if res.get("rate_limited"):
+        payload["rate_limited"] = True
+        payload["retry_after_s"] = res.get("retry_after_s")
+    if timed_out or res.get("cancelled"):
+        # stdout/stderr hold whatever the CLI printed before it was stopped
+        payload["timed_out"] = timed_out
+        payload["cancelled"] = bool(res.get("cancelled"))
+    return json.dumps(payload, ensure_ascii=False)
+
+
+def _at_ref(path: str) -> str:
+    """Quote a path as an @"..." reference safely (handles spaces/quotes)."""
+    raw = path[1:] if isinstance(path, str) and path.startswith("@") else str(path)
+    safe = raw.replace('"', '\\"')
+    return f'@"{safe}"'
+
+
+def _is_private_url(url: str) -> bool:
+    """Heuristically block private/loopback/link-local URLs (SSRF guard)."""
+    try:
+        u = urlparse(url)
+        if u.scheme not in {"http", "https"}:
+            return True
+        host = u.hostname or ""
+        # Explicit loopback/local hostname
+        if host in {"localhost"}:
+            return True
+        # Resolve all addresses
+        for fam, _, _, _, sockaddr in socket.getaddrinfo(host, None):
+            ip = sockaddr[0]
+            ip_obj = ipaddress.ip_address(ip)
+            if ip_obj.is_private or ip_obj.is_loopback or ip_obj.is_link_local or ip_obj.is_reserved or ip_obj.is_multicast:
+                return True
+        return False
+    except Exception:
+        # Treat unresolvable URLs as unsafe
+        return True
+
+
+# --- Gemini metadata cache ---------------------------------------------------------
+_metadata_cache_lock = threading.Lock()
+_metadata_cache = None  # metadata._MetadataCache, created by _get_metadata_cache()
+
+
+def _get_metadata_cache():
+    """Return the shared metadata cache (gemini_cli_bridge.metadata is imported on first use)."""
+    global _metadata_cache
+    with _metadata_cache_lock:
+        if _metadata_cache is None:
+            from .metadata import _MetadataCache  # keep import local
+            _metadata_cache = _MetadataCache()
+        return _metadata_cache
+
+
+def _invalidate_metadata_cache() -> None:
+    cache = _metadata_cache
+    if cache is not None:  # nothing cached before the first metadata call
+        cache.invalidate()
+
+
+@_tool("gemini_admin")
+def gemini_version(timeout_s: Optional[int] = None) -> str:
+    """Return installed gemini CLI version (gemini --version) as JSON (cached; see metadata._MetadataCache)."""
+    return _get_metadata_cache().get(["gemini", "--version"], "gemini_version", timeout_s)
+
+
+@_tool("gemini_admin")
+def gemini_mcp_list(scope: Optional[str] = None, timeout_s: Optional[int] = None) -> str:
+    """List MCP servers configured in gemini CLI (gemini mcp list). Scope: user|project. Cached."""
+    cmd = ["gemini", "mcp", "list"]
+    if scope in {"user", "project"}:
+        cmd += ["--scope", scope]
+    return _get_metadata_cache().get(cmd, "gemini_mcp_list", timeout_s)
+
+
+@_tool("gemini_admin")
+def gemini_mcp_add(
+    name: str,
+    command_or_url: str,
+    transport: str = "stdio",  # stdio|http|sse
+    args: Optional[List[str]] = None,
+    env_vars: Optional[Dict[str, str]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    scope: str = "project",  # user|project
+    timeout_ms: Optional[int] = None,
+    trust: bool = False,
+    description: Optional[str] = None,
+    include_tools: Optional[List[str]] = None,
+    exclude_tools: Optional[List[str]] = None,
+    timeout_s: Optional[int] = None,
+) -> str:
+    """Add an MCP server via gemini CLI (gemini mcp add ...).
+    transport: stdio|http|sse; for stdio pass executable, for http/sse pass URL.
+    headers are only valid for http/sse. Returns CLI stdout.
+    """
+    cmd = ["gemini", "mcp", "add", name]
+
+    # transport
+    if transport in {"http", "sse"}:
+        cmd += ["--transport", transport, command_or_url]
+    else:
+    # default: stdio
+        cmd += [command_or_url]
+        if args:
+            cmd += args
+
+    # scope
+    if scope in {"user", "project"}:
+        cmd += ["--scope", scope]
+
+    # env vars (-e KEY=VAL)
+    if env_vars:
+        for k, v in env_vars.items():
+            if k and v is not None:
+                cmd += ["-e", f"{k}={v}"]
+
+    # headers (-H "K: V")
+    if headers and transport in {"http", "sse"}:
+        for hk, hv in headers.items():
+            cmd += ["-H", f"{hk}: {hv}"]
+
+    if timeout_ms is not None and isinstance(timeout_ms, int) and timeout_ms > 0:
+        cmd += ["--timeout", str(timeout_ms)]
+    if trust:
+        cmd += ["--trust"]
+    if description:
+        cmd += ["--description", description]
+    if include_tools:
+        cmd += ["--include-tools", ",".join(include_tools)]
+    if exclude_tools:
+        cmd += ["--exclude-tools", ",".join(exclude_tools)]
+    try:
+        return _run_gemini_and_format_output(cmd, timeout_s=timeout_s, tool="gemini_mcp_add")
+    finally:
+        _invalidate_metadata_cache()
+
+
+@_tool("gemini_admin")
+def gemini_mcp_remove(name: str, scope: str = "project", timeout_s: Optional[int] = None) -> str:
+    """Remove an MCP server from gemini CLI (gemini mcp remove <name>)."""
+    cmd = ["gemini", "mcp", "remove", name]
+    if scope in {"user", "project"}:
+        cmd += ["--scope", scope]
+    try:
+        return _run_gemini_and_format_output(cmd, timeout_s=timeout_s, tool="gemini_mcp_remove")
+    finally:
+        _invalidate_metadata_cache()
+
+
+@_tool("gemini")
+def gemini_web_fetch(
+    prompt: str,
+    urls: List[str],
+    model: str = "gemini-2.5-pro",
+    include_dirs: Optional[List[str]] = None,
+    approval_mode: Optional[str] = None,  # default|auto_edit|yolo
+    yolo: bool = False,
+    checkpointing: bool = False,
+    extra_args: Optional[List[str]] = None,
+    timeout_s: Optional[int] = None,
+) -> str:
+    """Convenience wrapper: inject URLs into prompt to trigger CLI WebFetch.
+    Note: WebFetch is a CLI built-in; the model decides whether to call it.
+    """
+    urls = [u for u in (urls or []) if isinstance(u, str) and (u.startswith("http://") or u.startswith("https://"))]
+    if not urls:
+        raise ValueError("urls must contain at least one http(s) link")
+
+    composed = f"{prompt.strip()}\n\n" + "\n".join(urls)
+    cmd = ["gemini", "-m", model, "-p", composed]
+    if include_dirs:
+        cmd += ["--include-directories", ",".join(include_dirs)]
+    if checkpointing:
+        cmd += ["--checkpointing"]
+    if approval_mode in {"default", "auto_edit", "yolo"}:
+        cmd += ["--approval-mode", approval_mode]
+    elif yolo:
+        cmd += ["--yolo"]
+    if extra_args:
+        for a in extra_args:
+            if isinstance(a, str) and a.startswith("-"):
+                cmd.append(a)
+    return _run_gemini_and_format_output(cmd, timeout_s=timeout_s, tool="gemini_web_fetch")
+
+
+@_tool("gemini_admin")
+def gemini_extensions_list(timeout_s: Optional[int] = None) -> str:
+    """List available Gemini CLI extensions (gemini --list-extensions). Cached."""
+    return _get_metadata_cache().get(["gemini", "--list-extensions"], "gemini_extensions_list", timeout_s)
+
+
+@_tool("gemini")
+def gemini_usage_stats() -> str:
+    """Rolling summary of recent gemini CLI runs per model and per tool (latency, errors, bytes, tokens)."""
+    return json.dumps(_usage.summary(), ensure_ascii=False)
+
+
+@_tool("bridge")
+def bridge_stats(format: str = "json") -> str:
+    """Bridge metrics: per-tool calls/errors/timeouts and latency p50/p95/p99, subprocess,
+    truncation and cache counters, web fetch/DNS timings. format: json|prometheus.
+    """
+    if (format or "").strip().lower() == "prometheus":
+        return _metrics.prometheus()
+    data = _metrics.snapshot()
+    data["scheduler"] = _get_scheduler().snapshot()
+    data["tool_groups"] = _tool_groups
+    data["inflight_subprocesses"] = len(_children)
+    return json.dumps(data, ensure_ascii=False)
+
+
+@_tool("bridge")
+def bridge_rate_limits() -> str:
+    """Rate limiter state: mode, configured limits and per-bucket tokens/active/waiting/limited
+    counts (buckets: gemini, gemini:<model>, gcs, webfetch, webfetch:<host>)."""
+    return json.dumps(_get_rate_limiter().snapshot(), ensure_ascii=False)
+
+
+@_tool("bridge")
+def bridge_profile(
+    calls: int = 0,
+    seconds: int = 0,
+    directory: Optional[str] = None,
+    top: int = 15,
+    stop: bool = False,
+) -> str:
+    """Profile upcoming tool calls (cProfile + tracemalloc) for the next `calls` calls or `seconds`.
+    Writes .pstats/.folded/.tracemalloc files to `directory`; JSON-object responses gain a `profile`
+    summary (hot functions, peak allocation). No args: return status and the last summary.
+    """
+    profiler = _get_profiler()
+    if stop:
+        profiler.disarm()
+    elif calls > 0 or seconds > 0:
+        profiler.arm(calls=calls, seconds=seconds, directory=directory, top=top)
+    return json.dumps(profiler.status(), ensure_ascii=False)
+
+
+@_tool("gemini")
+def gemini_prompt_plus(
+    prompt: str,
+    model: str = "gemini-2.5-pro",
+    include_dirs: Optional[List[str]] = None,
+    attachments: Optional[List[str]] = None,
+    approval_mode: Optional[str] = None,  # default|auto_edit|yolo
+    yolo: bool = False,
+    checkpointing: bool = False,
+    extra_args: Optional[List[str]] = None,
+    timeout_s: Optional[int] = None,
+    session_id: Optional[str] = None,
+) -> str:
+    """Advanced non-interactive run with attachments/approval/checkpoint/dirs/flags.
+    - attachments: file/dir paths appended as @path at the end of prompt.
+    - approval_mode: default|auto_edit|yolo; if unset and yolo=True, add --yolo.
+    - session_id: continue a multi-turn gemini session (see gemini_sessions); later turns
+      resend only attachments whose content changed.
+    """
+    cmd = ["gemini", "-m", model]
+    if include_dirs:
+        cmd += ["--include-directories", ",".join(include_dirs)]
+    if checkpointing:
+        cmd += ["--checkpointing"]
+    if approval_mode in {"default", "auto_edit", "yolo"}:
+        cmd += ["--approval-mode", approval_mode]
+    elif yolo:
+        cmd += ["--yolo"]
+    tail = [a for a in (extra_args or []) if isinstance(a, str) and a.startswith("-")]
+    if session_id:
+        from .sessions import _gemini_session_turn  # keep import local
+        return _gemini_session_turn(
+            "gemini_prompt_plus", session_id, cmd, tail, [], attachments or [],
+            lambda _memory, attached: _plus_prompt(prompt, attached), timeout_s,
+        )
+    cmd += ["-p", _plus_prompt(prompt, attachments or []), *tail]
+    return _run_gemini_and_format_output(cmd, timeout_s=timeout_s, tool="gemini_prompt_plus")
+
+
+def _plus_prompt(prompt: str, attachments: List[str]) -> str:
+    final_prompt = prompt or ""
+    if attachments:
+        at_refs = " ".join(_at_ref(p) for p in attachments)
+        if at_refs:
+            final_prompt = (final_prompt.rstrip() + "\n\n" + at_refs).strip()
+    return final_prompt
+
+
+@_tool("gemini")
+def gemini_search(
+    query: str,
+    model: str = "gemini-2.5-pro",
+    include_dirs: Optional[List[str]] = None,
+    approval_mode: Optional[str] = None,
+    yolo: bool = True,
+    checkpointing: bool = False,
+    extra_args: Optional[List[str]] = None,
+    timeout_s: Optional[int] = None,
+) -> str:
+    """Lightweight search: guide the model to use built-in GoogleSearch and cite sources.
+    Note: tool invocation is model-driven; default yolo=True to avoid interactive prompts.
+    """
+    guidance = (
+        "Please use the built-in GoogleSearch tool to find up-to-date, authoritative sources, "
+        "then synthesize an answer with citations. Prioritize primary sources and include URLs.\n\n"
+    )
+    final_prompt = guidance + f"Search task: {query.strip()}"
+
+    cmd = ["gemini", "-m", model]
+    if include_dirs:
+        cmd += ["--include-directories", ",".join(include_dirs)]
+    if checkpointing:
+        cmd += ["--checkpointing"]
+    if approval_mode in {"default", "auto_edit", "yolo"}:
+        cmd += ["--approval-mode", approval_mode]
+    elif yolo:
+        cmd += ["--yolo"]
+    cmd += ["-p", final_prompt]
+    if extra_args:
+        for a in extra_args:
+            if isinstance(a, str) and a.startswith("-"):
+                cmd.append(a)
+    return _run_gemini_and_format_output(cmd, timeout_s=timeout_s, tool="gemini_search")
+
+
+@_tool("gemini")
+def gemini_prompt_with_memory(
+    prompt: str,
+    memory_paths: Optional[List[str]] = None,
+    attachments: Optional[List[str]] = None,
+    model: str = "gemini-2.5-pro",
+    include_dirs: Optional[List[str]] = None,
+    approval_mode: Optional[str] = None,
+    yolo: bool = False,
+    checkpointing: bool = False,
+    extra_args: Optional[List[str]] = None,
+    timeout_s: int = 180,
+    session_id: Optional[str] = None,
+) -> str:
+    """Inject memory_paths as high-priority context, then run non-interactively.
+    - memory_paths: authoritative project/system memory (e.g., GEMINI.md, conventions).
+    - attachments: additional files/dirs injected as @path.
+    - session_id: continue a multi-turn gemini session (see gemini_sessions); later turns
+      resend only memory files/attachments whose content changed.
+    """
+    cmd = ["gemini", "-m", model]
+    if include_dirs:
+        cmd += ["--include-directories", ",".join(include_dirs)]
+    if checkpointing:
+        cmd += ["--checkpointing"]
+    if approval_mode in {"default", "auto_edit", "yolo"}:
+        cmd += ["--approval-mode", approval_mode]
+    elif yolo:
+        cmd += ["--yolo"]
+    tail = [a for a in (extra_args or []) if isinstance(a, str) and a.startswith("-")]
+    if session_id:
+        from .sessions import _gemini_session_turn  # keep import local
+        return _gemini_session_turn(
+            "gemini_prompt_with_memory", session_id, cmd, tail, memory_paths or [], attachments or [],
+            lambda memory, attached: _memory_prompt(prompt, memory, attached), timeout_s,
+        )
+    cmd += ["-p", _memory_prompt(prompt, memory_paths or [], attachments or []), *tail]
+    return _run_gemini_and_format_output(cmd, timeout_s=timeout_s, tool="gemini_prompt_with_memory")
+
+
+def _memory_prompt(prompt: str, memory_paths: List[str], attachments: List[str]) -> str:
+    blocks: List[str] = []
+    if memory_paths:
+        at_mem = "\n".join(_at_ref(p) for p in memory_paths)
+        if at_mem:
+            blocks.append(
+                "[HIGH-PRIORITY CONTEXT]\n"
+                "Use the following project memory and conventions as authoritative context.\n\n"
+                + at_mem
+            )
+    if prompt:
+        blocks.append(prompt.strip())
+    if attachments:
+        at_refs = "\n".join(_at_ref(p) for p in attachments)
+        if at_refs:
+            blocks.append(at_refs)
+    return "\n\n".join(blocks).strip()
+
+
+# --- Gemini sessions -------------------------------------------------------------
+_gemini_sessions_lock = threading.Lock()
+_gemini_sessions = None  # sessions._GeminiSessions, created by _get_gemini_sessions()
+
+
+def _get_gemini_sessions():
+    """Return the gemini session store (gemini_cli_bridge.sessions is imported on first use)."""
+    global _gemini_sessions
+    with _gemini_sessions_lock:
+        if _gemini_sessions is None:
+            from .sessions import _GeminiSessions  # keep import local
+            _gemini_sessions = _GeminiSessions()
+        return _gemini_sessions
+
+
+@_tool("gemini")
+def gemini_sessions(close: Optional[str] = None) -> str:
+    """List this client's gemini sessions (session_id on gemini_prompt_plus / gemini_prompt_with_memory);
+    close=<session_id> forgets one first. Return JSON {closed?, sessions}."""
+    sessions = _get_gemini_sessions()
+    data: Dict[str, object] = {}
+    if close:
+        data["closed"] = sessions.close(close)
+    data["sessions"] = sessions.describe()
+    return json.dumps(data, ensure_ascii=False)
+
+
+# --- General system/network tools --------------------------------------------
+
+_shell_sessions_lock = threading.Lock()
+_shell_sessions = None  # shell._ShellSessions, created by _get_shell_sessions()
+
+
+def _get_shell_sessions():
+    """Return the named Shell session store (gemini_cli_bridge.shell is imported on first use)."""
+    global _shell_sessions
+    with _shell_sessions_lock:
+        if _shell_sessions is None:
+            from .shell import _ShellSessions  # keep import local
+            _shell_sessions = _ShellSessions()
+        return _shell_sessions
+
+
+@_tool("shell")
+def Shell(
+    cmd: str,
+    cwd: Optional[str] = None,
+    timeout_s: Optional[int] = None,
+    session: Optional[str] = None,
+) -> str:
+    """Execute a shell command; return JSON {code, stdout, stderr}. Disabled by default; set MCP_BASH_ALLOW=1 to enable.
+    session: reuse a named long-lived shell (keeps cd/exported vars between calls; see ShellSessions).
+    """
+    if os.getenv("MCP_BASH_ALLOW", "0") != "1":
+        return json.dumps({"code": 126, "stdout": "", "stderr": "Shell disabled (set MCP_BASH_ALLOW=1)"}, ensure_ascii=False)
+    to = _unify_timeout(timeout_s, default=120)
+    if session and os.name == "posix":
+        sessions = _get_shell_sessions()
+        with sessions.locked(session, cwd) as sess:
+            res = sess.run(cmd, cwd, to)
+        if res["timed_out"] or res["cancelled"] or res["exited"]:
+            # State is unknown (or gone): discard the session and its process group
+            sessions.drop(sess)
+        _metrics.incr("shell_session_commands")
+    else:
+        argv = ["/bin/sh", "-c", cmd] if os.name == "posix" else ["cmd", "/c", cmd]
+        # Background jobs the command starts on purpose survive a normal exit
+        res = _run(argv, timeout_s=to, cwd=cwd, env={}, raise_on_error=False, reap_on_exit=False)
+        res["code"] = res["exit_code"]
+    stderr = str(res["stderr"])
+    if res.get("timed_out"):
+        _mark_call(timeout=True)
+        stderr = (stderr.rstrip("\n") + "\n" if stderr else "") + f"timeout after {to}s"
+    elif res.get("cancelled"):
+        stderr = (stderr.rstrip("\n") + "\n" if stderr else "") + "cancelled"
+    return json.dumps({"code": res["code"], "stdout": res["stdout"], "stderr": stderr}, ensure_ascii=False)
+
+
+@_tool("shell")
+def ShellSessions(close: Optional[str] = None) -> str:
+    """List this client's named Shell sessions; close=<name> terminates one first. Return JSON {closed?, sessions}."""
+    sessions = _get_shell_sessions()
+    data: Dict[str, object] = {}
+    if close:
+        data["closed"] = sessions.close(close)
+    data["sessions"] = sessions.describe()
+    return json.dumps(data, ensure_ascii=False)
+
+
+# Tools included: Edit, FindFiles, GoogleSearch, ReadFile, ReadFolder, ReadManyFiles, SaveMemory, SearchText, Shell, WebFetch, WriteFile.
+# The files/web/search groups live in submodules of the same name, imported (and so
+# registered) only when their group is enabled; __getattr__ loads one on first access.
+_TOOL_MODULES: Dict[str, Tuple[str, ...]] = {
+    "files": ("FindFiles", "ReadFile", "ReadFolder", "ReadManyFiles", "SaveMemory", "SearchText", "WriteFile", "Edit"),
+    "web": ("WebFetch",),
+    "search": ("GoogleSearch", "GeminiGoogleSearch"),
+}
+
+
+def __getattr__(name: str):
+    for group, names in _TOOL_MODULES.items():
+        if name in names:
+            __import__(f"{__name__}.{group}")  # binds the submodule as globals()[group]
+            value = globals()[name] = getattr(globals()[group], name)
+            return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _load_tool_modules() -> None:
+    """Import the submodules of enabled tool groups; list the others' tools as disabled."""
+    for group, names in _TOOL_MODULES.items():
+        if _tool_group_enabled(group):
+            __import__(f"{__name__}.{group}")  # not importlib: -X importtime must see it
+        else:
+            _tool_groups.setdefault(group, {"enabled": False, "tools": list(names)})
+
+
+_load_tool_modules()
+
+
+def _configure_shared_scheduler() -> None:
+    """Shared server default: one session may use at most half the gemini slots."""
+    global _scheduler
+    if os.getenv("GEMINI_BRIDGE_SESSION_MAX_CONCURRENCY"):
+        return
+    capacity = _get_int_env("GEMINI_BRIDGE_MAX_CONCURRENCY", _DEFAULT_MAX_CONCURRENCY)
+    with _scheduler_lock:
+        _scheduler = _FairScheduler(capacity, max(capacity // 2, 1))
+
+
+def _parse_cli(argv: Optional[List[str]] = None):
+    """Parse server CLI flags; env vars provide the defaults."""
+    import argparse  # keep import local
+
+    parser = argparse.ArgumentParser(prog="gemini-cli-bridge", description="MCP bridge for Gemini CLI")
+    parser.add_argument(
+        "--transport",
+        choices=["stdio", "http", "streamable-http", "sse"],
+        default=os.getenv("GEMINI_BRIDGE_TRANSPORT", "stdio").strip().lower() or "stdio",
+        help="stdio (default), http/streamable-http or sse. Env: GEMINI_BRIDGE_TRANSPORT",
+    )
+    parser.add_argument(
+        "--host",
+        default=os.getenv("GEMINI_BRIDGE_HOST", "127.0.0.1").strip() or "127.0.0.1",
+        help="bind address for http/sse (default 127.0.0.1). Env: GEMINI_BRIDGE_HOST",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=_get_int_env("GEMINI_BRIDGE_PORT", 8765),
+        help="port for http/sse (default 8765). Env: GEMINI_BRIDGE_PORT",
+    )
+    parser.add_argument(
+        "--path",
+        default=os.getenv("GEMINI_BRIDGE_PATH", "").strip() or None,
+        help="URL path for the MCP endpoint (transport default when unset). Env: GEMINI_BRIDGE_PATH",
+    )
+    return parser.parse_args(argv)
+
+
+# 供 console_script 使用
+def main(argv: Optional[List[str]] = None) -> None:
+    """Entry point for uvx/pipx console_script.
+
+    Network transports share one process-wide scheduler, caches and metrics across
+    clients; on shutdown in-flight gemini subprocesses get GEMINI_BRIDGE_DRAIN_S
+    seconds (default 30) to finish before they are killed.
+    """
+    args = _parse_cli(argv)
+    drain = _get_int_env("GEMINI_BRIDGE_DRAIN_S", 30)
+    if args.transport != "stdio":
+        from . import transport  # keep import local: only network transports need it
+        problem = transport._network_transport_error()
+        if problem:
+            raise SystemExit(f"gemini-cli-bridge: {problem}")
+        _configure_shared_scheduler()
+    _start_metrics_exporters()
+    # last: prefetch runs gemini through the (now final) scheduler and rate limiter
+    if _tool_groups.get("gemini_admin", {}).get("enabled") and os.getenv("GEMINI_BRIDGE_METADATA_PREFETCH", "1") != "0":
+        _get_metadata_cache().prefetch()
+    try:
+        if args.transport == "stdio":
+            mcp.run()  # default STDIO transport
+        else:
+            kind = "sse" if args.transport == "sse" else "streamable-http"
+            transport._serve_network(kind, args.host, args.port, args.path, drain)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        _drain_children(0 if _draining.is_set() else drain)
+        if _shell_sessions is not None:
+            _shell_sessions.close_all()
+        if _rate_limiter is not None:
+            _rate_limiter.save(force=True)
+
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""`python -m gemini_cli_bridge`: run the MCP server (same as the gemini-cli-bridge script)."""
+
+from gemini_cli_bridge import main
+
+main()
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""File tools (group "files"): FindFiles, ReadFile, ReadFolder, ReadManyFiles, SaveMemory,
+SearchText, WriteFile and Edit.
+
+Imported by gemini_cli_bridge only when the group is enabled (or a tool is accessed).
+"""
+
+import bisect
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import gemini_cli_bridge as bridge
+from . import _tool
+
+
+@_tool("files")
+def FindFiles(pattern: str = "*", base: str = ".", recursive: bool = True) -> str:
+    """Find files; return JSON array of paths. Supports recursion."""
+    base_path = Path(base).expanduser().resolve()
+    try:
+        if recursive and "**" not in pattern:
+            pattern = f"**/{pattern}"
+        matches = [str(p) for p in base_path.glob(pattern) if p.exists()]
+        return json.dumps(matches, ensure_ascii=False)
+    except Exception as e:
+        return json.dumps({"error": str(e)}, ensure_ascii=False)
+
+
+@_tool("files")
+def ReadFile(path: str) -> str:
+    """Read a text file (utf-8, ignore errors). Raises if missing."""
+    p = Path(path).expanduser().resolve()
+    if not p.exists() or not p.is_file():
+        raise FileNotFoundError(str(p))
+    return p.read_text(encoding="utf-8", errors="ignore")
+
+
+@_tool("files")
+def ReadFolder(
+    path: str = ".",
+    recursive: bool = False,
+    max_entries: int = 2000,
+    max_depth: Optional[int] = None,
+    ignore: Optional[List[str]] = None,
+    cursor: Optional[str] = None,
+    details: bool = False,
+) -> str:
+    """Read a directory; return JSON array of entries (dirs end with "/"), at most max_entries.
+
+    - recursive / max_depth: descend (max_depth=1 lists only direct children; implies recursive).
+    - ignore: glob patterns matched against names and relative paths ("build/" = dirs only);
+      ignored directories are not descended.
+    - cursor / details: return {root, entries, next_cursor, truncated} instead. Pass cursor=""
+      for the first page and the returned next_cursor for the following ones. details=True
+      makes entries {path, type, size, mtime}.
+    Entries are in sorted depth-first order; listing stops as soon as the page is full.
+    Sorting reads each visited directory in full on the first page; the sorted listings of
+    large directories are cached, so following pages do not re-read them.
+    """
+    root = Path(path).expanduser().resolve()
+    depth = max_depth if max_depth is not None and max_depth > 0 else (None if recursive else 1)
+    limit = max(int(max_entries or 0), 1)  # a page must make progress
+    after = [c for c in (cursor or "").split("/") if c not in ("", ".", "..")]
+    try:
+        items: List[object] = []
+        truncated = False
+        last = None
+        for rel, entry in _scan_tree(str(root), depth, list(ignore or []), after):
+            if len(items) >= limit:
+                truncated = True
+                break
+            last = rel
+            if details:
+                items.append(_entry_details(entry))
+            else:
+                items.append(entry.path + ("/" if entry.is_dir() else ""))
+        if cursor is None and not details:
+            return json.dumps(items, ensure_ascii=False)
+        return json.dumps(
+            {
+                "root": str(root),
+                "entries": items,
+                "next_cursor": last if truncated else None,
+                "truncated": truncated,
+            },
+            ensure_ascii=False,
+        )
+    except Exception as e:
+        return json.dumps({"error": str(e)}, ensure_ascii=False)
+
+
+_LISTING_CACHE_MIN = 1024  # smaller directories are cheap to re-read and sort
+_LISTING_CACHE_DIRS = 4
+_listing_cache_lock = threading.Lock()
+_listing_cache: Dict[tuple, Tuple[List[str], List["os.DirEntry"]]] = {}
+
+
+def _sorted_listing(dirpath: str) -> Tuple[List[str], List["os.DirEntry"]]:
+    """(names, entries) of dirpath sorted by name.
+
+    Sorted output needs a full read and sort of the directory, so listings of large
+    directories are kept (keyed by device, inode and mtime, so adding, removing or
+    renaming an entry invalidates them) and later cursor pages bisect into them instead
+    of re-reading. Env: GEMINI_BRIDGE_LISTING_CACHE=0 disables this.
+    """
+    enabled = os.getenv("GEMINI_BRIDGE_LISTING_CACHE", "1") != "0"
+    key = None
+    if enabled:
+        st = os.stat(dirpath)
+        key = (dirpath, st.st_dev, st.st_ino, st.st_mtime_ns)
+        with _listing_cache_lock:
+            hit = _listing_cache.pop(key, None)
+            if hit is not None:
+                _listing_cache[key] = hit  # most recently used last
+                bridge._metrics.incr("listing_cache_hits")
+                return hit
+    with os.scandir(dirpath) as it:
+        entries = sorted(it, key=lambda e: e.name)
+    listing = ([e.name for e in entries], entries)
+    if key is not None and len(entries) >= _LISTING_CACHE_MIN:
+        with _listing_cache_lock:
+            for stale in [k for k in _listing_cache if k[0] == dirpath]:
+                del _listing_cache[stale]
+            _listing_cache[key] = listing
+            while len(_listing_cache) > _LISTING_CACHE_DIRS:
+                del _listing_cache[next(iter(_listing_cache))]
+    return listing
+
+
+def _scan_tree(root: str, max_depth: Optional[int], ignore: List[str], after: List[str]):
+    """Yield (relative path, os.DirEntry) under root in sorted depth-first pre-order.
+
+    `after` holds the path components of the last entry already returned: the walk
+    resumes right after it, re-reading only the directories along that path (large ones
+    come from _sorted_listing's cache). Entry types come from the dirent (no stat);
+    symlinked directories are listed but not followed.
+    """
+    import fnmatch  # keep import local
+
+    def ignored(name: str, rel: str, is_dir: bool) -> bool:
+        for pat in ignore:
+            if pat.endswith("/"):
+                if is_dir and (fnmatch.fnmatch(name, pat[:-1]) or fnmatch.fnmatch(rel, pat[:-1])):
+                    return True
+            elif fnmatch.fnmatch(name, pat) or fnmatch.fnmatch(rel, pat):
+                return True
+        return False
+
+    def walk(dirpath: str, prefix: str, level: int, after: List[str]):
+        try:
+            names, entries = _sorted_listing(dirpath)
+        except OSError:
+            if level == 1:
+                raise
+            return
+        start = after[0] if after else None
+        for i in range(bisect.bisect_left(names, start) if start is not None else 0, len(entries)):
+            entry = entries[i]
+            rel = prefix + entry.name
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if ignore and ignored(entry.name, rel, is_dir):
+                continue
+            resumed = start is not None and entry.name == start
+            if not resumed:
+                yield rel, entry
+            if is_dir and (max_depth is None or level < max_depth):
+                yield from walk(entry.path, rel + "/", level + 1, after[1:] if resumed else [])
+
+    return walk(root, "", 1, after)
+
+
+def _entry_details(entry: "os.DirEntry") -> Dict[str, object]:
+    """{path, type, size, mtime} for a scandir entry; one lstat, no path re-resolution.
+
+    The entry may come from a cached listing, so size/mtime are read fresh rather than
+    from the DirEntry's own stat cache.
+    """
+    if entry.is_symlink():
+        kind = "symlink"
+    elif entry.is_dir(follow_symlinks=False):
+        kind = "dir"
+    elif entry.is_file(follow_symlinks=False):
+        kind = "file"
+    else:
+        kind = "other"
+    info: Dict[str, object] = {"path": entry.path + ("/" if kind == "dir" else ""), "type": kind}
+    try:
+        st = os.lstat(entry.path)
+        info["size"] = st.st_size
+        info["mtime"] = round(st.st_mtime, 3)
+    except OSError:
+        info["size"] = info["mtime"] = None
+    return info
+
+
+@_tool("files")
+def ReadManyFiles(paths: List[str], ignore_missing: bool = True) -> str:
+    """Read multiple files; return JSON object {path: content}."""
+    result: Dict[str, str] = {}
+    for p0 in paths or []:
+        p = Path(str(p0)).expanduser().resolve()
+        if not p.exists() or not p.is_file():
+            if ignore_missing:
+                continue
+            raise FileNotFoundError(str(p))
+        try:
+            result[str(p)] = p.read_text(encoding="utf-8", errors="ignore")
+        except Exception as e:
+            result[str(p)] = f"<error: {e}>"
+    return json.dumps(result, ensure_ascii=False)
+
+
+@_tool("files")
+def SaveMemory(path: str, content: str, mode: str = "append") -> str:
+    """Save content to path; mode=append|overwrite; return JSON {ok, bytes}."""
+    p = Path(path).expanduser().resolve()
+    p.parent.mkdir(parents=True, exist_ok=True)
+    data = content or ""
+    try:
+        if mode == "overwrite":
+            p.write_text(data, encoding="utf-8")
+        else:
+            with p.open("a", encoding="utf-8") as f:
+                f.write(data)
+        return json.dumps({"ok": True, "bytes": len(data)}, ensure_ascii=False)
+    except Exception as e:
+        return json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False)
+
+
+@_tool("files")
+def SearchText(pattern: str, path: str, case_insensitive: bool = False) -> str:
+    """Search text within a file; return JSON array [{line, text}]."""
+    p = Path(path).expanduser().resolve()
+    results: List[Dict[str, object]] = []
+    if not p.exists() or not p.is_file():
+        return json.dumps(results, ensure_ascii=False)
+    try:
+        text = p.read_text(encoding="utf-8", errors="ignore")
+        flags = re.MULTILINE | (re.IGNORECASE if case_insensitive else 0)
+        for i, line in enumerate(text.splitlines(), start=1):
+            if re.search(pattern, line, flags=flags):
+                results.append({"line": i, "text": line})
+        return json.dumps(results, ensure_ascii=False)
+    except Exception as e:
+        return json.dumps({"error": str(e)}, ensure_ascii=False)
+
+
+@_tool("files")
+def WriteFile(path: str, content: str) -> str:
+    """Write a UTF-8 text file, creating parents as needed. Return "ok"."""
+    p = Path(path).expanduser().resolve()
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(content, encoding="utf-8")
+    return "ok"
+
+
+@_tool("files")
+def Edit(path: str, find: str, replace: str, count: int = 0) -> str:
+    """String replace; count=0 means replace all. Return JSON {"replaced": n}."""
+    p = Path(path).expanduser().resolve()
+    if not p.exists() or not p.is_file():
+        raise FileNotFoundError(str(p))
+    s = p.read_text(encoding="utf-8", errors="ignore")
+    if count == 0:
+        replaced = s.count(find)
+        s2 = s.replace(find, replace)
+    else:
+        replaced = min(s.count(find), max(count, 0))
+        s2 = s.replace(find, replace, replaced)
+    p.write_text(s2, encoding="utf-8")
+    return json.dumps({"replaced": replaced}, ensure_ascii=False)
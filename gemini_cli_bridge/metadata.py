@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Cache for read-only gemini metadata commands (gemini_version, gemini_extensions_list,
+gemini_mcp_list), invalidated by CLI binary/config changes.
+
+Imported on first use by gemini_cli_bridge._get_metadata_cache().
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import gemini_cli_bridge as bridge
+from . import _env_with_path, _get_int_env, _run_gemini_and_format_output
+
+
+_METADATA_COMMANDS = (
+    (("gemini", "--version"), "gemini_version"),
+    (("gemini", "--list-extensions"), "gemini_extensions_list"),
+    (("gemini", "mcp", "list"), "gemini_mcp_list"),
+)
+
+
+def _gemini_config_fingerprint() -> tuple:
+    """(path, mtime_ns, size) of everything the read-only metadata commands depend on:
+    the gemini binary on PATH (and its resolved target) plus the CLI's system, user and
+    project settings files and extension directories."""
+    import shutil  # keep import local
+    import sys
+
+    paths: List[str] = []
+    exe = shutil.which("gemini", path=_env_with_path({}).get("PATH"))
+    if exe:
+        paths += [exe, os.path.realpath(exe)]
+    for base in (Path(os.path.expanduser("~")) / ".gemini", Path.cwd() / ".gemini"):
+        paths += [str(base / "settings.json"), str(base / "extensions")]
+    paths.append(
+        os.getenv("GEMINI_CLI_SYSTEM_SETTINGS_PATH")
+        or ("/Library/Application Support/GeminiCli/settings.json" if sys.platform == "darwin"
+            else "/etc/gemini-cli/settings.json")
+    )
+    out = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            out.append((p, st.st_mtime_ns, st.st_size))
+        except OSError:
+            out.append((p, None, None))
+    return tuple(out)
+
+
+class _MetadataCache:
+    """Successful results of read-only gemini metadata commands (version, extensions, MCP list).
+
+    An entry is served while the config fingerprint is unchanged and it is younger than
+    GEMINI_BRIDGE_METADATA_TTL_S (default 600). Concurrent misses for one command share a
+    single gemini run. GEMINI_BRIDGE_METADATA_CACHE=0 disables caching.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[tuple, Tuple[tuple, float, str]] = {}
+        self._inflight: Dict[tuple, threading.Event] = {}
+        self._generation = 0
+
+    @staticmethod
+    def enabled() -> bool:
+        return os.getenv("GEMINI_BRIDGE_METADATA_CACHE", "1") != "0"
+
+    def get(self, cmd: List[str], tool: str, timeout_s: Optional[int] = None) -> str:
+        if not self.enabled():
+            return _run_gemini_and_format_output(cmd, timeout_s=timeout_s, tool=tool)
+        key = (tuple(cmd), os.getcwd())
+        ttl = _get_int_env("GEMINI_BRIDGE_METADATA_TTL_S", 600)
+        while True:
+            fingerprint = _gemini_config_fingerprint()
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == fingerprint and time.time() - entry[1] < ttl:
+                    bridge._metrics.incr("metadata_cache_hits")
+                    data = json.loads(entry[2])
+                    data["cached"] = True
+                    data["cache_age_s"] = round(time.time() - entry[1], 3)
+                    return json.dumps(data, ensure_ascii=False)
+                waiter = self._inflight.get(key)
+                if waiter is None:
+                    waiter = self._inflight[key] = threading.Event()
+                    generation = self._generation
+                    break
+            waiter.wait()  # another call is running this command; reuse its result
+        bridge._metrics.incr("metadata_cache_misses")
+        try:
+            payload = _run_gemini_and_format_output(cmd, timeout_s=timeout_s, tool=tool)
+            if json.loads(payload).get("ok"):
+                with self._lock:
+                    if generation == self._generation:
+                        self._entries[key] = (fingerprint, time.time(), payload)
+            return payload
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            waiter.set()
+
+    def invalidate(self) -> None:
+        """Drop every entry; runs already in flight will not be stored."""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+        bridge._metrics.incr("metadata_cache_invalidations")
+
+    def prefetch(self) -> None:
+        """Warm all metadata commands on a background thread (server start)."""
+        if not self.enabled():
+            return
+
+        def _warm():
+            for cmd, tool in _METADATA_COMMANDS:
+                with contextlib.suppress(Exception):
+                    self.get(list(cmd), tool)
+
+        threading.Thread(target=_warm, name="gcb-metadata-prefetch", daemon=True).start()
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""Opt-in cProfile/tracemalloc capture of tool calls (see bridge_profile).
+
+Imported on first use by gemini_cli_bridge._get_profiler().
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from . import _get_int_env
+
+
+def _folded_stacks(stats: Dict[tuple, tuple], max_depth: int = 48) -> Dict[str, float]:
+    """Approximate collapsed stacks ("a;b;c weight_us") from pstats caller edges.
+
+    Each function's self time is split across its callers in proportion to the
+    cumulative time recorded on each edge; good enough for flamegraph.pl/speedscope.
+    """
+    def label(func: tuple) -> str:
+        filename, line, name = func
+        return f"{name} ({os.path.basename(filename)}:{line})" if line else name
+
+    out: Dict[str, float] = {}
+
+    def walk(func: tuple, weight: float, path: List[str], seen: frozenset) -> None:
+        callers = stats.get(func, (0, 0, 0.0, 0.0, {}))[4]
+        edges = [(c, v[3]) for c, v in callers.items() if c not in seen and c in stats]
+        total = sum(w for _, w in edges)
+        if not edges or total <= 0 or len(path) >= max_depth:
+            key = ";".join(reversed(path))
+            out[key] = out.get(key, 0.0) + weight
+            return
+        for caller, w in edges:
+            share = weight * w / total
+            if share >= 1.0:  # drop sub-microsecond branches
+                walk(caller, share, path + [label(caller)], seen | {caller})
+
+    for func, (_, _, tt, _, _) in stats.items():
+        if tt > 0:
+            walk(func, tt * 1_000_000, [label(func)], frozenset({func}))
+    return out
+
+
+class _Profiler:
+    """Opt-in cProfile/tracemalloc capture for the next N tool calls or a time window.
+
+    Env: GEMINI_BRIDGE_PROFILE (next N calls), GEMINI_BRIDGE_PROFILE_SECONDS (window),
+    GEMINI_BRIDGE_PROFILE_DIR (output dir, default <tmp>/gemini-cli-bridge-profiles).
+    Only one call is profiled at a time; concurrent calls run unprofiled.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._busy = threading.Lock()
+        self._env_loaded = False
+        self._armed = False
+        self._remaining = 0
+        self._until = 0.0
+        self._top = 15
+        self._dir: Optional[Path] = None
+        self._seq = 0
+        self.last: Optional[Dict[str, object]] = None
+
+    def _load_env(self) -> None:
+        self._env_loaded = True
+        calls = _get_int_env("GEMINI_BRIDGE_PROFILE", 0)
+        seconds = _get_int_env("GEMINI_BRIDGE_PROFILE_SECONDS", 0)
+        if calls or seconds:
+            self.arm(calls=calls, seconds=seconds, directory=os.getenv("GEMINI_BRIDGE_PROFILE_DIR"))
+
+    def arm(self, calls: int = 0, seconds: int = 0, directory: Optional[str] = None, top: int = 15) -> None:
+        import tempfile  # keep import local
+        with self._lock:
+            self._remaining = max(int(calls or 0), 0)
+            self._until = time.time() + seconds if seconds and seconds > 0 else 0.0
+            self._top = max(int(top or 15), 1)
+            raw = directory or os.getenv("GEMINI_BRIDGE_PROFILE_DIR", "").strip()
+            self._dir = Path(raw).expanduser() if raw else Path(tempfile.gettempdir()) / "gemini-cli-bridge-profiles"
+            self._armed = bool(self._remaining or self._until)
+
+    def disarm(self) -> None:
+        with self._lock:
+            self._armed = False
+            self._remaining = 0
+            self._until = 0.0
+
+    def claim(self, tool: str) -> bool:
+        """Return True if this call should be profiled (consumes one slot)."""
+        if not self._env_loaded:
+            self._load_env()
+        if not self._armed or tool.startswith("bridge_"):
+            return False
+        with self._lock:
+            if self._until and time.time() > self._until and not self._remaining:
+                self._armed = False
+                return False
+            if not self._busy.acquire(blocking=False):
+                return False
+            if self._remaining:
+                self._remaining -= 1
+            self._armed = bool(self._remaining or (self._until and time.time() <= self._until))
+            return True
+
+    def status(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "armed": self._armed,
+                "remaining_calls": self._remaining,
+                "until": self._until or None,
+                "directory": str(self._dir) if self._dir else None,
+                "last": self.last,
+            }
+
+    def call(self, tool: str, fn, args, kwargs):
+        """Run fn under cProfile + tracemalloc, write artifacts, attach a summary."""
+        import cProfile  # keep imports local: profiling is opt-in
+        import pstats
+        import tracemalloc
+
+        try:
+            prof = cProfile.Profile()
+            own_tracing = not tracemalloc.is_tracing()
+            if own_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            t0, c0 = time.perf_counter(), time.thread_time()
+            prof.enable()
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                prof.disable()
+                wall_ms = (time.perf_counter() - t0) * 1000
+                cpu_ms = (time.thread_time() - c0) * 1000
+                _, peak = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot()
+                if own_tracing:
+                    tracemalloc.stop()
+                summary = self._write(tool, prof, pstats, snapshot, wall_ms, cpu_ms, peak)
+        finally:
+            self._busy.release()
+        return self._attach(result, summary)
+
+    def _write(self, tool, prof, pstats, snapshot, wall_ms, cpu_ms, peak) -> Dict[str, object]:
+        with self._lock:
+            self._seq += 1
+            seq, top_n, directory = self._seq, self._top, self._dir
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{tool}-{os.getpid()}-{seq}"
+        stats = pstats.Stats(prof)
+        raw = stats.stats  # type: ignore[attr-defined]
+        hot = sorted(raw.items(), key=lambda kv: kv[1][2], reverse=True)[:top_n]
+        summary: Dict[str, object] = {
+            "tool": tool,
+            "wall_ms": round(wall_ms, 3),
+            "cpu_ms": round(cpu_ms, 3),  # bridge thread CPU; the rest is waiting (child process, I/O)
+            "wait_ms": round(max(wall_ms - cpu_ms, 0.0), 3),
+            "peak_alloc_bytes": peak,
+            "top_functions": [
+                {
+                    "function": f"{name} ({filename}:{line})" if line else name,
+                    "calls": nc,
+                    "self_ms": round(tt * 1000, 3),
+                    "cum_ms": round(ct * 1000, 3),
+                }
+                for (filename, line, name), (_, nc, tt, ct, _) in hot
+            ],
+            "top_allocations": [
+                {"where": str(st.traceback), "bytes": st.size, "count": st.count}
+                for st in snapshot.statistics("lineno")[:5]
+            ],
+            "files": {},
+        }
+        try:
+            if directory is None:
+                raise ValueError("profile directory not configured")
+            directory.mkdir(parents=True, exist_ok=True)
+            pstats_path = directory / f"{stem}.pstats"
+            folded_path = directory / f"{stem}.folded"
+            mem_path = directory / f"{stem}.tracemalloc"
+            stats.dump_stats(str(pstats_path))
+            folded = _folded_stacks(raw)
+            folded_path.write_text(
+                "".join(f"{k} {int(v)}\n" for k, v in sorted(folded.items()) if int(v) > 0),
+                encoding="utf-8",
+            )
+            snapshot.dump(str(mem_path))
+            summary["files"] = {"pstats": str(pstats_path), "folded": str(folded_path), "tracemalloc": str(mem_path)}
+        except Exception as e:
+            summary["error"] = str(e)
+        self.last = summary
+        return summary
+
+    @staticmethod
+    def _attach(result, summary: Dict[str, object]):
+        """Embed the summary into JSON-object results; other results are returned unchanged."""
+        if isinstance(result, str) and result.startswith("{"):
+            try:
+                data = json.loads(result)
+            except Exception:
+                return result
+            if isinstance(data, dict):
+                data["profile"] = summary
+                return json.dumps(data, ensure_ascii=False)
+        return result
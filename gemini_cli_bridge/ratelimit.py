@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""Token-bucket rate limiting for gemini runs, GCS and WebFetch.
+
+Imported on first use by gemini_cli_bridge._get_rate_limiter().
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import gemini_cli_bridge as bridge
+from . import _POLL_S, _RateLimited, _get_int_env
+
+
+class _Bucket:
+    """Token bucket refilled at rpm/60 tokens per second up to `burst`, plus an optional
+    cap on concurrent runs. rpm=0 limits concurrency only."""
+
+    def __init__(self, rpm: float = 0, burst: Optional[float] = None, concurrency: Optional[int] = None,
+                 mode: Optional[str] = None):
+        self.rpm = max(float(rpm or 0), 0.0)
+        self.burst = max(float(burst or self.rpm or 1), 1.0)
+        self.concurrency = max(int(concurrency), 1) if concurrency else None
+        self.mode = mode
+        self.tokens = self.burst
+        self.stamp = time.time()  # wall clock: levels are persisted across restarts
+        self.active = 0
+        self.waiting = 0
+        self.limited = 0
+
+    def _refill(self, now: float) -> None:
+        if self.rpm > 0:
+            self.tokens = min(self.burst, self.tokens + max(now - self.stamp, 0.0) * self.rpm / 60.0)
+        self.stamp = now
+
+    def wait_s(self, now: float) -> Optional[float]:
+        """Seconds until a run may start: 0 now, None while all concurrency slots are taken."""
+        self._refill(now)
+        if self.concurrency is not None and self.active >= self.concurrency:
+            return None
+        if self.rpm <= 0 or self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) * 60.0 / self.rpm
+
+
+class _RateLimiter:
+    """Token buckets keyed by backend ("gemini", "gcs", "webfetch"), model ("gemini:<model>")
+    and host ("webfetch:<host>"). A key without its own limit uses its "<prefix>:*" entry; keys
+    with neither are unlimited.
+
+    mode "wait" blocks until every bucket of a call has a token and a free slot (up to
+    max_wait_s); "fail" raises _RateLimited at once. Token levels are saved to
+    state_path (throttled to once a second, and on shutdown) and restored at startup
+    so a restart does not hand out a fresh burst.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, Dict[str, object]],
+        mode: str = "wait",
+        max_wait_s: float = 60.0,
+        state_path: Optional[str] = None,
+    ):
+        self.limits = limits
+        self.mode = mode
+        self.max_wait_s = float(max_wait_s)
+        self.state_path = state_path
+        self._cond = threading.Condition()
+        self._buckets: Dict[str, _Bucket] = {}
+        self._restored = self._load()
+        self._dirty = False
+        self._saved_at = 0.0
+
+    def _spec(self, key: str) -> Optional[Dict[str, object]]:
+        spec = self.limits.get(key)
+        if spec is None and ":" in key:
+            spec = self.limits.get(key.split(":", 1)[0] + ":*")
+        return spec
+
+    def _bucket(self, key: str) -> Optional[_Bucket]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            spec = self._spec(key)
+            if spec is None:
+                return None
+            bucket = self._buckets[key] = _Bucket(
+                spec.get("rpm") or 0, spec.get("burst"), spec.get("concurrency"), spec.get("mode")
+            )
+            saved = self._restored.pop(key, None)
+            if isinstance(saved, dict):
+                try:
+                    bucket.tokens = min(float(saved["tokens"]), bucket.burst)
+                    bucket.stamp = min(float(saved["stamp"]), time.time())
+                except (KeyError, TypeError, ValueError):
+                    pass
+        return bucket
+
+    def acquire(self, keys: List[str], cancel: Optional[threading.Event] = None) -> List[_Bucket]:
+        """Take a token and a slot from every limited bucket in keys; see release()."""
+        t0 = time.monotonic()
+        waited = False
+        with self._cond:
+            buckets = [(k, b) for k, b in ((k, self._bucket(k)) for k in keys) if b is not None]
+            if not buckets:
+                return []
+            while True:
+                now = time.time()
+                blocked = [(w, k, b) for k, b in buckets for w in (b.wait_s(now),) if w is None or w > 0]
+                if not blocked:
+                    break
+                retry = max((w for w, _, _ in blocked if w is not None), default=0.0)
+                key = max(blocked, key=lambda x: -1.0 if x[0] is None else x[0])[1]
+                fail_fast = any((b.mode or self.mode) == "fail" for _, _, b in blocked)
+                if (
+                    fail_fast
+                    or time.monotonic() - t0 + retry > self.max_wait_s
+                    or (cancel is not None and cancel.is_set())
+                ):
+                    for _, _, b in blocked:
+                        b.limited += 1
+                    bridge._metrics.incr("rate_limited")
+                    raise _RateLimited(key, retry)
+                waited = True
+                for _, _, b in blocked:
+                    b.waiting += 1
+                try:
+                    self._cond.wait(min(retry or _POLL_S, _POLL_S))
+                finally:
+                    for _, _, b in blocked:
+                        b.waiting -= 1
+            for _, b in buckets:
+                if b.rpm > 0:
+                    b.tokens -= 1
+                b.active += 1
+            self._dirty = True
+        if waited:
+            bridge._metrics.incr("rate_limit_waits")
+            bridge._metrics.observe("rate_limit_wait", (time.monotonic() - t0) * 1000)
+        self.save()
+        return [b for _, b in buckets]
+
+    def release(self, buckets: List[_Bucket]) -> None:
+        if not buckets:
+            return
+        with self._cond:
+            for b in buckets:
+                b.active -= 1
+            self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def limit(self, *keys: str, cancel: Optional[threading.Event] = None):
+        taken = self.acquire(list(keys), cancel)
+        try:
+            yield
+        finally:
+            self.release(taken)
+
+    def _load(self) -> Dict[str, object]:
+        if not self.state_path:
+            return {}
+        try:
+            data = json.loads(Path(self.state_path).read_text(encoding="utf-8"))
+            return dict(data.get("buckets") or {})
+        except Exception:
+            return {}
+
+    def save(self, force: bool = False) -> None:
+        """Persist token levels (at most once a second unless force)."""
+        if not self.state_path:
+            return
+        with self._cond:
+            if not (self._dirty or force) or (not force and time.monotonic() - self._saved_at < 1.0):
+                return
+            for b in self._buckets.values():
+                b._refill(time.time())
+            state = {
+                "buckets": {
+                    **{k: v for k, v in self._restored.items() if isinstance(v, dict)},
+                    **{k: {"tokens": round(b.tokens, 3), "stamp": b.stamp} for k, b in self._buckets.items()},
+                }
+            }
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        try:
+            path = Path(self.state_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(state), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._cond:
+            for key in self.limits:
+                if not key.endswith(":*"):
+                    self._bucket(key)
+            now = time.time()
+            buckets = {}
+            for key, b in sorted(self._buckets.items()):
+                b._refill(now)
+                buckets[key] = {
+                    "rpm": b.rpm,
+                    "burst": b.burst,
+                    "tokens": round(b.tokens, 3),
+                    "concurrency": b.concurrency,
+                    "active": b.active,
+                    "waiting": b.waiting,
+                    "limited": b.limited,
+                    "mode": b.mode or self.mode,
+                }
+        return {
+            "mode": self.mode,
+            "max_wait_s": self.max_wait_s,
+            "state_file": self.state_path,
+            "limits": self.limits,
+            "buckets": buckets,
+        }
+
+
+def _parse_rate_limits(raw: str) -> Dict[str, Dict[str, object]]:
+    """Parse GEMINI_BRIDGE_RATE_LIMITS; a bare number is shorthand for {"rpm": n}."""
+    try:
+        cfg = json.loads(raw) if raw.strip() else {}
+    except Exception:
+        return {}
+    limits: Dict[str, Dict[str, object]] = {}
+    for key, spec in (cfg.items() if isinstance(cfg, dict) else ()):
+        if isinstance(spec, (int, float)) and not isinstance(spec, bool):
+            spec = {"rpm": spec}
+        if isinstance(spec, dict):
+            limits[str(key)] = spec
+    return limits
+
+
+def _limiter_from_env() -> _RateLimiter:
+    """Build the shared rate limiter from the environment (see _get_rate_limiter)."""
+    limits = _parse_rate_limits(os.getenv("GEMINI_BRIDGE_RATE_LIMITS", ""))
+    mode = os.getenv("GEMINI_BRIDGE_RATE_LIMIT_MODE", "wait").strip().lower()
+    state = os.getenv("GEMINI_BRIDGE_RATE_LIMIT_STATE", "").strip()
+    if not state:
+        cache = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        state = os.path.join(cache, "gemini-cli-bridge", "ratelimits.json")
+    return _RateLimiter(
+        limits,
+        mode="fail" if mode == "fail" else "wait",
+        max_wait_s=_get_int_env("GEMINI_BRIDGE_RATE_LIMIT_MAX_WAIT_S", 60),
+        state_path=None if not limits or state.lower() == "none" else state,
+    )
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""Model routing for prompt tools: latency-based hedging and fallback on quota errors.
+
+Imported by gemini_cli_bridge._run_gemini_and_format_output only when a routing env
+var is set (see _routing_configured).
+"""
+
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import gemini_cli_bridge as bridge
+from . import _POLL_S, _cancel_event, _percentile, _run_gemini_once
+
+
+_QUOTA_PATTERNS = (r"\b429\b", r"RESOURCE_EXHAUSTED", r"quota", r"rate.?limit", r"too many requests")
+_ROUTING_DEFAULTS: Dict[str, object] = {
+    "hedge_model": None,
+    "fallback_models": [],
+    "hedge_percentile": 95,
+    "hedge_min_samples": 20,
+    "hedge_min_ms": 1000,
+    "hedge_after_ms": None,
+    "quota_patterns": list(_QUOTA_PATTERNS),
+}
+
+
+def _routing_policy(tool: Optional[str]) -> Optional[Dict[str, object]]:
+    """Resolve the routing policy for a tool (None when routing is off).
+
+    Env: GEMINI_BRIDGE_HEDGE_MODEL, GEMINI_BRIDGE_FALLBACK_MODELS (comma-separated) set
+    the defaults; GEMINI_BRIDGE_ROUTING holds a JSON object whose "default" and
+    per-tool entries (e.g. "gemini_prompt") override them key by key. Per-tool
+    {"enabled": false} opts a tool out.
+    """
+    policy: Dict[str, object] = dict(_ROUTING_DEFAULTS)
+    hedge_env = os.getenv("GEMINI_BRIDGE_HEDGE_MODEL", "").strip()
+    if hedge_env:
+        policy["hedge_model"] = hedge_env
+    fallback_env = os.getenv("GEMINI_BRIDGE_FALLBACK_MODELS", "")
+    if fallback_env.strip():
+        policy["fallback_models"] = [m.strip() for m in fallback_env.split(",") if m.strip()]
+    raw = os.getenv("GEMINI_BRIDGE_ROUTING", "").strip()
+    if raw:
+        try:
+            cfg = json.loads(raw)
+        except Exception:
+            cfg = {}
+        if isinstance(cfg, dict):
+            for key in ("default", tool or "gemini"):
+                if isinstance(cfg.get(key), dict):
+                    policy.update(cfg[key])
+    if policy.get("enabled") is False:
+        return None
+    if isinstance(policy.get("fallback_models"), str):
+        policy["fallback_models"] = [m.strip() for m in str(policy["fallback_models"]).split(",") if m.strip()]
+    if not policy.get("hedge_model") and not policy.get("fallback_models"):
+        return None
+    return policy
+
+
+def _with_model(cmd: List[str], model: str) -> List[str]:
+    """Return a copy of cmd with the `-m` value replaced by model."""
+    out = list(cmd)
+    i = out.index("-m")
+    out[i + 1] = model
+    return out
+
+
+def _is_quota_error(res: Dict[str, object], patterns: List[str]) -> bool:
+    """Whether a failed run looks like quota exhaustion / rate limiting (429)."""
+    if res.get("exit_code") == 0 or res.get("timed_out") or res.get("cancelled"):
+        return False
+    text = f"{res.get('stderr') or ''}\n{res.get('stdout') or ''}"
+    return any(re.search(p, text, re.IGNORECASE) for p in patterns)
+
+
+def _hedge_deadline_ms(model: str, policy: Dict[str, object]) -> Optional[float]:
+    """Deadline after which to hedge a run of model, from its observed latency.
+
+    Uses the `hedge_percentile` of recent successful runs once `hedge_min_samples`
+    exist (floored at `hedge_min_ms`); before that, the static `hedge_after_ms` if set.
+    """
+    samples = bridge._usage.latencies(model)
+    if len(samples) >= int(policy.get("hedge_min_samples") or 1):
+        pct = float(policy.get("hedge_percentile") or 95)
+        return max(_percentile(samples, pct), float(policy.get("hedge_min_ms") or 0))
+    after = policy.get("hedge_after_ms")
+    return float(after) if after is not None else None
+
+
+def _attempt_info(model: str, res: Dict[str, object], *, hedge: bool) -> Dict[str, object]:
+    info: Dict[str, object] = {
+        "model": model,
+        "ok": res.get("exit_code") == 0,
+        "exit_code": res.get("exit_code"),
+        "wall_ms": (res.get("timing") or {}).get("wall_ms"),
+        "hedge": hedge,
+    }
+    if res.get("cancelled"):
+        info["cancelled"] = True
+    return info
+
+
+def _run_hedged(
+    cmd: List[str],
+    model: str,
+    hedge_model: str,
+    hedge_after_ms: float,
+    timeout_s: Optional[int],
+) -> Tuple[str, Dict[str, object], List[Tuple[str, Dict[str, object], bool]]]:
+    """Race model against hedge_model, starting the hedge only after hedge_after_ms.
+
+    Returns (answering model, its result, [(model, result, is_hedge), ...] for every
+    run started; the cancelled loser is reported as {"cancelled": True}). The first
+    successful run wins; if both fail, the last to finish is returned.
+    """
+    outer = _cancel_event.get()
+    cond = threading.Condition()
+    finished: List[Tuple[str, Dict[str, object], bool]] = []
+    cancels: Dict[bool, threading.Event] = {}
+    launched: List[Tuple[str, bool]] = []
+
+    def launch(m: str, is_hedge: bool) -> None:
+        ev = cancels[is_hedge] = threading.Event()
+        launched.append((m, is_hedge))
+        ctx = contextvars.copy_context()
+        c = _with_model(cmd, m)
+
+        def target() -> None:
+            try:
+                r = ctx.run(_run_gemini_once, c, timeout_s, ev)
+            except Exception as e:  # keep the race alive; report as a failed run
+                r = {"cmd": c, "exit_code": None, "stdout": "", "stderr": str(e)}
+            with cond:
+                finished.append((m, r, is_hedge))
+                cond.notify_all()
+
+        threading.Thread(target=target, name=f"gemini-{'hedge' if is_hedge else 'primary'}", daemon=True).start()
+
+    hedge_at = time.monotonic() + hedge_after_ms / 1000.0
+    launch(model, False)
+    winner: Optional[Tuple[str, Dict[str, object], bool]] = None
+    with cond:
+        while True:
+            winner = next((f for f in finished if f[1].get("exit_code") == 0), None)
+            if winner is not None or len(finished) == len(cancels):
+                break
+            stopping = outer is not None and outer.is_set()
+            if stopping:
+                for ev in cancels.values():
+                    ev.set()
+            if True in cancels or stopping:
+                cond.wait(_POLL_S)
+            elif time.monotonic() >= hedge_at:
+                bridge._metrics.incr("gemini_hedged")
+                launch(hedge_model, True)
+            else:
+                cond.wait(min(_POLL_S, hedge_at - time.monotonic()))
+        runs = list(finished)
+    for ev in cancels.values():
+        ev.set()  # no-op for the finished run; stops the loser
+    if winner is None:
+        winner = runs[-1]
+    done = {is_hedge for _, _, is_hedge in runs}
+    runs += [(m, {"exit_code": None, "cancelled": True}, h) for m, h in launched if h not in done]
+    return winner[0], winner[1], runs
+
+
+def _run_routed(
+    cmd: List[str],
+    model: str,
+    policy: Dict[str, object],
+    timeout_s: Optional[int],
+) -> Tuple[str, Dict[str, object], Dict[str, object]]:
+    """Run cmd under a routing policy: hedging plus fallback on quota errors.
+
+    Returns (answering model, result, routing info). Completed non-winning runs are
+    still fed to the usage stats so per-model latency/error rates stay accurate.
+    """
+    outer = _cancel_event.get()
+    patterns = [str(p) for p in (policy.get("quota_patterns") or [])]
+    chain = [model] + [str(m) for m in (policy.get("fallback_models") or []) if m != model]
+    attempts: List[Dict[str, object]] = []
+    extra: List[Tuple[str, Dict[str, object]]] = []
+    used, res = model, {}
+    for i, m in enumerate(chain):
+        if i:
+            bridge._metrics.incr("gemini_fallbacks")
+        hedge_model = policy.get("hedge_model")
+        deadline = _hedge_deadline_ms(m, policy) if hedge_model and hedge_model != m else None
+        if deadline is not None:
+            used, res, runs = _run_hedged(cmd, m, str(hedge_model), deadline, timeout_s)
+            for rm, rr, is_hedge in runs:
+                attempts.append(_attempt_info(rm, rr, hedge=is_hedge))
+                if rr is not res:
+                    extra.append((rm, rr))
+        else:
+            used, res = m, _run_gemini_once(_with_model(cmd, m), timeout_s)
+            attempts.append(_attempt_info(m, res, hedge=False))
+        if res.get("exit_code") == 0 or (outer is not None and outer.is_set()):
+            break
+        if not _is_quota_error(res, patterns):
+            break
+        if i + 1 < len(chain):
+            extra.append((used, res))
+    for rm, rr in extra:
+        if not rr.get("cancelled"):
+            bridge._usage.record(rm, None, {
+                "ok": rr.get("exit_code") == 0,
+                "wall_ms": (rr.get("timing") or {}).get("wall_ms"),
+                "queue_ms": rr.get("queue_ms"),
+                "bytes_out": rr.get("bytes_out"),
+            })
+    routing = {
+        "requested_model": model,
+        "hedged": any(a["hedge"] for a in attempts),
+        "fallback": any(a["model"] != model and not a["hedge"] for a in attempts),
+        "attempts": attempts,
+    }
+    return used, res, routing
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""GoogleSearch and its GeminiGoogleSearch alias (group "search").
+
+Imported by gemini_cli_bridge only when the group is enabled (or a tool is accessed).
+"""
+
+import contextlib
+import json
+import os
+import time
+from typing import Optional
+from urllib.parse import urlencode
+
+import gemini_cli_bridge as bridge
+from . import _RateLimited, _cancel_event, _mark_call, _rate_limit, _rate_limited_fields, _tool, gemini_search
+
+
+@_tool("search")
+def GoogleSearch(
+    query: str,
+    limit: int = 5,
+    cse_id: Optional[str] = None,
+    api_key: Optional[str] = None,
+    model: str = "gemini-2.5-pro",
+    timeout_s: int = 120,
+    mode: Optional[str] = None,  # auto | gemini_cli | gcs
+) -> str:
+    """Search tool (defaults to Gemini CLI built-in GoogleSearch).
+
+        Modes:
+        - mode="gemini_cli": force CLI built-in (no keys; requires signed-in gemini CLI)
+        - mode="gcs": force Google Programmable Search (requires GOOGLE_CSE_ID + GOOGLE_API_KEY)
+        - mode=None/"auto": auto-select (use gcs if both keys present, else gemini_cli)
+
+        Returns JSON:
+        - gemini_cli: { ok: true, mode: "gemini_cli", answer: string }
+        - gcs: { ok: true, mode: "gcs", results: [{title, link, snippet}] }
+            on error: { ok: false, error, results? }
+        """
+    selected = (mode or "auto").strip().lower()
+    cse = cse_id or os.getenv("GOOGLE_CSE_ID")
+    key = api_key or os.getenv("GOOGLE_API_KEY")
+
+    # select mode
+    use_cli = False
+    if selected == "gemini_cli":
+        use_cli = True
+    elif selected == "gcs":
+        use_cli = False
+    else:  # auto
+        use_cli = not (cse and key)
+
+    # built-in path: call gemini_search (non-interactive, yolo=True)
+    if use_cli:
+        try:
+            # reuse gemini_search tool logic
+            answer = gemini_search(query=query, model=model, yolo=True, timeout_s=timeout_s)
+            return json.dumps({"ok": True, "mode": "gemini_cli", "answer": answer}, ensure_ascii=False)
+        except Exception as e:
+            _mark_call(error=True)
+            return json.dumps({"ok": False, "mode": "gemini_cli", "error": str(e)}, ensure_ascii=False)
+
+    # GCS mode (requires key + cse)
+    if not (cse and key):
+        return json.dumps({
+            "ok": False,
+            "mode": "gcs",
+            "results": [],
+            "error": "GOOGLE_CSE_ID/GOOGLE_API_KEY not provided",
+        }, ensure_ascii=False)
+    try:
+        import urllib.request  # keep import local: only the GCS path needs it
+        params = {
+            "key": key,
+            "cx": cse,
+            "q": query,
+            "num": max(1, min(int(limit or 5), 10)),  # API allows up to 10 per call
+        }
+        url = f"https://www.googleapis.com/customsearch/v1?{urlencode(params)}"
+        headers = {"User-Agent": "gemini-cli-bridge/1.0"}
+        req = urllib.request.Request(url, headers=headers)
+        with _rate_limit("gcs", cancel=_cancel_event.get()):
+            t0 = time.perf_counter()
+            with contextlib.closing(urllib.request.urlopen(req, timeout=timeout_s)) as resp:
+                charset = resp.headers.get_content_charset() or "utf-8"
+                raw = resp.read().decode(charset, errors="ignore")
+            bridge._metrics.observe("gcs_fetch", (time.perf_counter() - t0) * 1000)
+        data = json.loads(raw or "{}")
+        items = data.get("items", []) or []
+        results = []
+        for it in items:
+            results.append({
+                "title": it.get("title"),
+                "link": it.get("link"),
+                "snippet": it.get("snippet"),
+            })
+        return json.dumps({"ok": True, "mode": "gcs", "results": results}, ensure_ascii=False)
+    except _RateLimited as e:
+        _mark_call(error=True)
+        return json.dumps(
+            {"ok": False, "mode": "gcs", "results": [], "error": str(e), **_rate_limited_fields(e)}, ensure_ascii=False
+        )
+    except Exception as e:
+        _mark_call(error=True)
+        return json.dumps({"ok": False, "mode": "gcs", "results": [], "error": str(e)}, ensure_ascii=False)
+
+@_tool("search")
+def GeminiGoogleSearch(
+    query: str,
+    limit: int = 5,
+    cse_id: Optional[str] = None,
+    api_key: Optional[str] = None,
+    model: str = "gemini-2.5-pro",
+    timeout_s: Optional[int] = None,
+    mode: Optional[str] = None,
+) -> str:
+    """Alias to GoogleSearch to avoid tool name collisions in some IDEs."""
+    return GoogleSearch(query=query, limit=limit, cse_id=cse_id, api_key=api_key, model=model, timeout_s=timeout_s, mode=mode)
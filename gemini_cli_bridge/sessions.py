@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""Multi-turn gemini sessions (session_id on gemini_prompt_plus / gemini_prompt_with_memory).
+
+Imported on first use by gemini_cli_bridge._get_gemini_sessions() and the prompt tools.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import gemini_cli_bridge as bridge
+from . import _current_session, _get_gemini_sessions, _get_int_env, _run_gemini_and_format_output
+
+
+def _content_hash(path: str) -> str:
+    """Content fingerprint of an attachment: sha256 of a file's bytes, or of a directory's
+    (relative path, size, mtime) listing. "missing" when it cannot be read."""
+    import hashlib  # keep import local
+
+    p = Path(path[1:] if path.startswith("@") else path).expanduser()
+    h = hashlib.sha256()
+    try:
+        if p.is_dir():
+            for root, dirs, files in os.walk(p):
+                dirs.sort()
+                for name in sorted(files):
+                    fp = os.path.join(root, name)
+                    st = os.stat(fp)
+                    h.update(f"{os.path.relpath(fp, p)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8", "ignore"))
+        else:
+            with open(p, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+    except OSError:
+        return "missing"
+    return h.hexdigest()
+
+
+class _GeminiSession:
+    """State of one multi-turn gemini conversation: what each attachment looked like when
+    last sent, and how to resume the CLI's saved chat."""
+
+    def __init__(self, key: tuple):
+        self.key = key
+        self.lock = threading.Lock()
+        self.created = time.time()
+        self.last_used = time.monotonic()
+        self.turns = 0
+        self.hashes: Dict[str, str] = {}
+        self.cli_session: Optional[str] = None
+        self.resume = True
+
+
+class _GeminiSessions:
+    """gemini sessions keyed by (MCP client session, session_id), with idle expiry and a cap.
+
+    Env: GEMINI_BRIDGE_CHAT_IDLE_S (default 1800), GEMINI_BRIDGE_CHAT_MAX_SESSIONS (default 16).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions: Dict[tuple, _GeminiSession] = {}
+
+    def acquire(self, name: str) -> _GeminiSession:
+        key = (_current_session.get(), name)
+        idle_s = _get_int_env("GEMINI_BRIDGE_CHAT_IDLE_S", 1800)
+        cap = _get_int_env("GEMINI_BRIDGE_CHAT_MAX_SESSIONS", 16)
+        with self._lock:
+            now = time.monotonic()
+            for k, sess in list(self._sessions.items()):
+                if now - sess.last_used > idle_s and not sess.lock.locked():
+                    del self._sessions[k]
+                    bridge._metrics.incr("gemini_sessions_expired")
+            sess = self._sessions.get(key)
+            if sess is None:
+                if len(self._sessions) >= cap:
+                    idle = [s for s in self._sessions.values() if not s.lock.locked()]
+                    if not idle:
+                        raise RuntimeError(f"too many busy gemini sessions (max {cap})")
+                    del self._sessions[min(idle, key=lambda s: s.last_used).key]
+                    bridge._metrics.incr("gemini_sessions_evicted")
+                sess = self._sessions[key] = _GeminiSession(key)
+            sess.last_used = now
+            return sess
+
+    def close(self, name: str) -> bool:
+        with self._lock:
+            return self._sessions.pop((_current_session.get(), name), None) is not None
+
+    def describe(self) -> List[Dict[str, object]]:
+        owner = _current_session.get()
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "session_id": k[1],
+                    "turns": s.turns,
+                    "busy": s.lock.locked(),
+                    "attachments": len(s.hashes),
+                    "resumable": s.resume and s.turns > 0,
+                    "idle_s": round(now - s.last_used, 3),
+                }
+                for k, s in sorted(self._sessions.items())
+                if k[0] == owner
+            ]
+
+
+_RESUME_UNSUPPORTED = re.compile(r"unknown (argument|option)|unrecognized|no (previous |saved )?sessions?", re.IGNORECASE)
+
+
+def _gemini_session_turn(
+    tool: str,
+    session_id: str,
+    cmd: List[str],
+    tail: List[str],
+    memory_paths: List[str],
+    attachments: List[str],
+    compose: Callable[[List[str], List[str]], str],
+    timeout_s: Optional[int],
+) -> str:
+    """Run one turn of a gemini session.
+
+    Turns run with --checkpointing and JSON output; once a turn succeeded and the CLI
+    reported its session id, that chat is resumed (GEMINI_BRIDGE_CHAT_RESUME_FLAG, default
+    "--resume") and only memory files/attachments whose content hash changed are sent again.
+    Without a reported id (resuming "latest" could pick up another client's chat), or if the
+    CLI rejects the resume or JSON flags, the session falls back to full-context turns. Set
+    the flag to "none" to always send full context.
+    """
+    flag = os.getenv("GEMINI_BRIDGE_CHAT_RESUME_FLAG", "--resume").strip()
+    resume_on = bool(flag) and flag.lower() != "none"
+    sess = _get_gemini_sessions().acquire(session_id)
+    with sess.lock:
+        keys = {p: str(Path(p[1:] if p.startswith("@") else p).expanduser().resolve()) for p in memory_paths + attachments}
+        current = {keys[p]: _content_hash(p) for p in keys}
+        resumable = resume_on and sess.resume
+        resumed = resumable and sess.turns > 0 and sess.cli_session is not None
+
+        def turn(resume: bool, cli_json: bool) -> Dict[str, object]:
+            def changed(paths: List[str]) -> List[str]:
+                return [p for p in paths if not resume or sess.hashes.get(keys[p]) != current[keys[p]]]
+
+            memory, attached = changed(memory_paths), changed(attachments)
+            run_cmd = list(cmd)
+            if "--checkpointing" not in run_cmd:
+                run_cmd.append("--checkpointing")
+            if resume:
+                run_cmd += [flag, str(sess.cli_session)]
+            run_cmd += ["-p", compose(memory, attached), *tail]
+            data = json.loads(_run_gemini_and_format_output(run_cmd, timeout_s=timeout_s, tool=tool, cli_json=cli_json))
+            data["session"] = {"id": session_id, "resumed": resume, "sent": memory + attached}
+            return data
+
+        data = turn(resumed, resumable)
+        if (
+            resumable
+            and not data.get("ok")
+            and not (data.get("timed_out") or data.get("cancelled"))
+            and _RESUME_UNSUPPORTED.search(str(data.get("stderr") or ""))
+        ):
+            # --resume or --output-format rejected (older CLI): plain full-context turns from now on
+            sess.resume = False
+            bridge._metrics.incr("gemini_session_resume_failed")
+            data = turn(False, False)
+        if data.get("ok"):
+            sess.turns += 1
+            sess.hashes.update(current)
+            sess.cli_session = (data.get("stats") or {}).get("cli_session_id") or sess.cli_session
+            if sess.cli_session is None:
+                sess.resume = False  # nothing to resume safely
+        session = data["session"]
+        session["turn"] = sess.turns
+        session["unchanged"] = [p for p in memory_paths + attachments if p not in session["sent"]]
+        sess.last_used = time.monotonic()
+    return json.dumps(data, ensure_ascii=False)
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""Persistent named /bin/sh sessions for the Shell tool (Shell(session=...)).
+
+Imported on first use by gemini_cli_bridge._get_shell_sessions().
+"""
+
+import contextlib
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional
+
+import gemini_cli_bridge as bridge
+from . import _cancel_event, _current_session, _env_with_path, _get_int_env, _terminate_group, get_max_out
+
+
+class _ShellSession:
+    """Long-lived /bin/sh; commands are framed by a per-command sentinel on stdout/stderr."""
+
+    def __init__(self, key: tuple, cwd: Optional[str]):
+        import queue  # keep import local
+
+        self.key = key
+        self.lock = threading.Lock()
+        self.created = time.time()
+        self.last_used = time.monotonic()
+        self.commands = 0
+        self.proc = subprocess.Popen(
+            ["/bin/sh"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=_env_with_path({}),
+            cwd=cwd,
+            start_new_session=True,
+        )
+        self._queues = {"stdout": queue.Queue(), "stderr": queue.Queue()}
+        for name, pipe in (("stdout", self.proc.stdout), ("stderr", self.proc.stderr)):
+            threading.Thread(
+                target=self._pump, args=(pipe, self._queues[name]), name=f"gcb-shell-{name}", daemon=True
+            ).start()
+        bridge._metrics.incr("shell_sessions_started")
+
+    @staticmethod
+    def _pump(pipe, q) -> None:
+        for line in iter(lambda: pipe.readline(65536), b""):
+            q.put(line)
+        q.put(None)  # EOF
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def close(self) -> None:
+        with contextlib.suppress(Exception):
+            self.proc.stdin.close()
+        _terminate_group(self.proc, 0.5)
+
+    def run(self, cmd: str, cwd: Optional[str], timeout_s: int) -> Dict[str, object]:
+        """Run one command; return {code, stdout, stderr, timed_out, cancelled, exited}."""
+        import queue
+        import secrets
+        import shlex
+
+        marker = f"__GCB_{secrets.token_hex(8)}__"
+        # `command eval`: a syntax error in cmd must not exit the session shell
+        run = f"command eval {shlex.quote(cmd)}"
+        body = f"cd {shlex.quote(cwd)} && {run}" if cwd else run
+        script = (
+            f"{{ {body}\n}} </dev/null\n"
+            f"printf '\\n%s %s\\n' '{marker}' \"$?\"\n"
+            f"printf '\\n%s\\n' '{marker}' >&2\n"
+        )
+        limit = get_max_out()
+        buf: Dict[str, List[str]] = {"stdout": [], "stderr": []}
+        size = {"stdout": 0, "stderr": 0}
+        dropped = {"stdout": 0, "stderr": 0}
+        done = {"stdout": False, "stderr": False}
+        code: Optional[int] = None
+        timed_out = cancelled = exited = False
+        cancel = _cancel_event.get()
+        self.commands += 1
+        try:
+            self.proc.stdin.write(script.encode("utf-8"))
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError):  # ValueError: stdin already closed
+            exited = True
+        deadline = time.monotonic() + timeout_s
+        while not exited and not all(done.values()):
+            if time.monotonic() >= deadline:
+                timed_out = True
+                break
+            if cancel is not None and cancel.is_set():
+                cancelled = True
+                break
+            progressed = False
+            for name, q in self._queues.items():
+                if done[name]:
+                    continue
+                try:
+                    raw = q.get(timeout=0.05 if not progressed else 0)
+                except queue.Empty:
+                    continue
+                progressed = True
+                if raw is None:  # the shell itself exited (e.g. `exit` in cmd)
+                    exited = True
+                    break
+                line = raw.decode("utf-8", errors="ignore")
+                if line.startswith(marker):
+                    done[name] = True
+                    if name == "stdout":
+                        with contextlib.suppress(ValueError, IndexError):
+                            code = int(line.split()[1])
+                    continue
+                if size[name] < limit:
+                    buf[name].append(line)
+                    size[name] += len(line)
+                else:
+                    dropped[name] += len(line)
+        self.last_used = time.monotonic()
+
+        def text(name: str) -> str:
+            out = "".join(buf[name])
+            if done[name] and out.endswith("\n"):
+                out = out[:-1]  # newline printed in front of the sentinel
+            if size[name] > limit or dropped[name]:
+                bridge._metrics.incr("bytes_truncated", max(size[name] - limit, 0) + dropped[name])
+                out = out[:limit] + "\n...[truncated]..."
+            return out
+
+        if exited:
+            with contextlib.suppress(Exception):
+                self.proc.wait(timeout=1)
+            code = self.proc.returncode if code is None else code
+        return {
+            "code": 124 if timed_out else 130 if cancelled else (code if code is not None else 1),
+            "stdout": text("stdout"),
+            "stderr": text("stderr"),
+            "timed_out": timed_out,
+            "cancelled": cancelled,
+            "exited": exited,
+        }
+
+
+class _ShellSessions:
+    """Named shell sessions, scoped per MCP client session, with idle eviction and a size cap.
+
+    Env: GEMINI_BRIDGE_SHELL_IDLE_S (default 600), GEMINI_BRIDGE_SHELL_MAX_SESSIONS (default 8).
+    A daemon reaper runs while any session exists, so idle shells (and the background jobs
+    they started) are closed even if no further Shell call arrives.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions: Dict[tuple, _ShellSession] = {}
+        self._reaper: Optional[threading.Thread] = None
+
+    def _evict(self, key: tuple) -> None:
+        sess = self._sessions.pop(key, None)
+        if sess is not None:
+            sess.close()
+            bridge._metrics.incr("shell_sessions_evicted")
+
+    def _sweep(self, idle_s: int) -> None:
+        now = time.monotonic()
+        for k, sess in list(self._sessions.items()):
+            if not sess.alive() or (now - sess.last_used > idle_s and not sess.lock.locked()):
+                self._evict(k)
+
+    def _reap(self) -> None:
+        """Evict idle sessions in the background; exits when none are left (acquire restarts it)."""
+        while True:
+            idle_s = _get_int_env("GEMINI_BRIDGE_SHELL_IDLE_S", 600)
+            time.sleep(min(max(idle_s / 4, 0.25), 30))
+            with self._lock:
+                self._sweep(idle_s)
+                if not self._sessions:
+                    self._reaper = None
+                    return
+
+    def acquire(self, name: str, cwd: Optional[str]) -> _ShellSession:
+        key = (_current_session.get(), name)
+        idle_s = _get_int_env("GEMINI_BRIDGE_SHELL_IDLE_S", 600)
+        cap = _get_int_env("GEMINI_BRIDGE_SHELL_MAX_SESSIONS", 8)
+        with self._lock:
+            self._sweep(idle_s)
+            sess = self._sessions.get(key)
+            if sess is None:
+                if len(self._sessions) >= cap:
+                    idle = [s for s in self._sessions.values() if not s.lock.locked()]
+                    if not idle:
+                        raise RuntimeError(f"too many busy shell sessions (max {cap})")
+                    self._evict(min(idle, key=lambda s: s.last_used).key)
+                sess = self._sessions[key] = _ShellSession(key, cwd)
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap, name="gcb-shell-reaper", daemon=True)
+                self._reaper.start()
+            return sess
+
+    @contextlib.contextmanager
+    def locked(self, name: str, cwd: Optional[str]):
+        """Yield the named session with its lock held.
+
+        A call queued on the lock may find its session dropped meanwhile (timeout,
+        cancel, exit, eviction or the reaper); it then starts over on a fresh one.
+        """
+        while True:
+            sess = self.acquire(name, cwd)
+            with sess.lock:
+                with self._lock:
+                    current = self._sessions.get(sess.key) is sess and sess.alive()
+                if current:
+                    yield sess
+                    return
+
+    def drop(self, sess: _ShellSession) -> None:
+        with self._lock:
+            if self._sessions.get(sess.key) is sess:
+                self._evict(sess.key)
+
+    def close(self, name: str) -> bool:
+        with self._lock:
+            key = (_current_session.get(), name)
+            found = key in self._sessions
+            self._evict(key)
+            return found
+
+    def close_all(self) -> None:
+        with self._lock:
+            for k in list(self._sessions):
+                self._evict(k)
+
+    def describe(self) -> List[Dict[str, object]]:
+        owner = _current_session.get()
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "session": k[1],
+                    "pid": s.proc.pid,
+                    "alive": s.alive(),
+                    "busy": s.lock.locked(),
+                    "commands": s.commands,
+                    "idle_s": round(now - s.last_used, 3),
+                }
+                for k, s in sorted(self._sessions.items())
+                if k[0] == owner
+            ]
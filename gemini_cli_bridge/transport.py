@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Streamable HTTP / SSE serving with a draining shutdown (--transport http|sse).
+
+Imported by gemini_cli_bridge.main() only for network transports.
+"""
+
+import threading
+from typing import Optional
+
+import gemini_cli_bridge as bridge
+from . import _draining, _wait_inflight
+
+
+def _network_transport_error() -> Optional[str]:
+    """Why http/sse can't be served by the installed fastmcp, or None when it can."""
+    try:
+        from fastmcp.server.context import Context  # keep import local
+    except ImportError:
+        Context = None
+    # per-session fairness needs Context.session_id, which (like this http_app) is 2.9+
+    if not hasattr(bridge.mcp, "http_app") or not hasattr(Context, "session_id"):
+        return "--transport http/sse requires fastmcp>=2.9 (pip install -U 'fastmcp>=2.9')"
+    return None
+
+
+def _serve_network(transport: str, host: str, port: int, path: Optional[str], drain_s: int) -> None:
+    """Serve streamable HTTP or SSE with uvicorn and a draining shutdown.
+
+    On SIGINT/SIGTERM new tool calls are refused and in-flight ones get up to drain_s
+    seconds to finish (responses still reach their clients) before uvicorn stops;
+    a second signal forces exit.
+    """
+    import signal  # keep imports local: only needed for network transports
+    import uvicorn
+
+    app = bridge.mcp.http_app(path=path, transport=transport) if path else bridge.mcp.http_app(transport=transport)
+
+    class _DrainingServer(uvicorn.Server):
+        def handle_exit(self, sig, frame):
+            if _draining.is_set():
+                return uvicorn.Server.handle_exit(self, sig, frame)
+            _draining.set()
+
+            def _drain_then_exit():
+                _wait_inflight(drain_s)
+                uvicorn.Server.handle_exit(self, sig, frame)
+
+            threading.Thread(target=_drain_then_exit, name="gcb-drain", daemon=True).start()
+
+    def _interrupt(signum, frame):
+        raise KeyboardInterrupt
+
+    # uvicorn re-raises the captured signal after shutdown; make SIGTERM unwind like
+    # Ctrl+C so main() still reaps leftover subprocesses instead of dying mid-exit.
+    signal.signal(signal.SIGTERM, _interrupt)
+    config = uvicorn.Config(app, host=host, port=port, timeout_graceful_shutdown=min(drain_s, 5), log_level="info")
+    _DrainingServer(config).run()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""WebFetch (group "web").
+
+Imported by gemini_cli_bridge only when the group is enabled (or the tool is accessed).
+"""
+
+import json
+import time
+from typing import Dict
+from urllib.parse import urlparse
+
+import gemini_cli_bridge as bridge
+from . import _RateLimited, _cancel_event, _mark_call, _rate_limit, _rate_limited_fields, _tool, _truncate
+
+
+@_tool("web")
+def WebFetch(url: str, timeout_s: int = 15) -> str:
+    """Minimal web fetch using the requests library; return JSON {ok,status,content?,error?}."""
+    data: Dict[str, object] = {"url": url, "ok": False, "status": None, "content": None, "error": None}
+    # Basic SSRF guard
+    t0 = time.perf_counter()
+    blocked = bridge._is_private_url(url)
+    bridge._metrics.observe("webfetch_dns", (time.perf_counter() - t0) * 1000)
+    if blocked:
+        data["error"] = "Blocked private/loopback URL"
+        _mark_call(error=True)
+        return json.dumps(data, ensure_ascii=False)
+    headers = {"User-Agent": "gemini-cli-bridge/1.0"}
+    try:
+        import requests  # keep import local
+        host_key = f"webfetch:{(urlparse(url).hostname or '').lower()}"
+        with _rate_limit("webfetch", host_key, cancel=_cancel_event.get()):
+            t0 = time.perf_counter()
+            r = requests.get(url, headers=headers, timeout=timeout_s)
+            bridge._metrics.observe("webfetch_fetch", (time.perf_counter() - t0) * 1000)
+        content = _truncate(r.text)  # use configured max output
+        data.update({"ok": bool(r.ok), "status": r.status_code, "content": content})
+    except _RateLimited as e:
+        data.update({"error": str(e), **_rate_limited_fields(e)})
+    except Exception as e:
+        data["error"] = str(e)
+    if not data["ok"]:
+        _mark_call(error=True)
+    return json.dumps(data, ensure_ascii=False)
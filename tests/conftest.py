@@ -1,5 +1,8 @@
 import os
 import sys
+import time
+
+import pytest
 
 
 def pytest_sessionstart(session):
@@ -8,3 +11,53 @@ def pytest_sessionstart(session):
     if test_dir not in sys.path:
         sys.path.insert(0, test_dir)
 
+
+@pytest.fixture(autouse=True)
+def _fresh_metadata_cache(monkeypatch):
+    # cached gemini metadata must not leak between tests
+    import gemini_cli_bridge as gcb
+
+    monkeypatch.setattr(gcb, "_metadata_cache", None)
+
+
+class FakeRun:
+    """Stand-in for gcb._run that records commands and returns a `_run`-shaped dict.
+
+    Set exit_code/stdout/stderr/delay for a fixed answer, or `respond(cmd) -> dict` to
+    override any of them (and any result key, e.g. "timing") per command. A delayed
+    run honours the `cancel` event the bridge passes and then reports `cancelled`.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.exit_code = 0
+        self.stdout = "ok"
+        self.stderr = ""
+        self.delay = 0.0
+        self.respond = None
+
+    def __call__(self, cmd, **kwargs):
+        self.calls.append(cmd)
+        spec = {"exit_code": self.exit_code, "stdout": self.stdout, "stderr": self.stderr, "delay": self.delay}
+        if self.respond is not None:
+            spec.update(self.respond(cmd) or {})
+        delay = spec.pop("delay")
+        cancel = kwargs.get("cancel")
+        t0 = time.perf_counter()
+        if cancel is not None and cancel.wait(delay):
+            return {"cmd": cmd, "exit_code": 130, "stdout": "", "stderr": "", "cancelled": True,
+                    "timing": {"wall_ms": (time.perf_counter() - t0) * 1000}}
+        if cancel is None and delay:
+            time.sleep(delay)
+        result = {"cmd": cmd, "timing": {"spawn_ms": 0.1, "wall_ms": (time.perf_counter() - t0) * 1000}}
+        result.update(spec)
+        return result
+
+
+@pytest.fixture
+def fake_run(monkeypatch):
+    import gemini_cli_bridge as gcb
+
+    fake = FakeRun()
+    monkeypatch.setattr(gcb, "_run", fake)
+    return fake
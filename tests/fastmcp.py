@@ -7,6 +7,6 @@ class FastMCP:
             return func
         return _decorator
 
-    def run(self) -> None:
+    def run(self, *args, **kwargs) -> None:
         pass
 
@@ -0,0 +1,52 @@
+import json
+import sys
+from pathlib import Path
+
+import gemini_cli_bridge as gcb
+
+FAKE = Path(__file__).resolve().parent.parent / "benchmarks" / "fake_gemini.py"
+
+
+def _install_fake(monkeypatch, tmp_path):
+    shim = tmp_path / "gemini"
+    shim.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE}" "$@"\n', encoding="utf-8")
+    shim.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}:/usr/bin:/bin")
+
+
+def test_gemini_prompt_end_to_end_with_fake_cli(monkeypatch, tmp_path):
+    _install_fake(monkeypatch, tmp_path)
+    monkeypatch.setenv("GEMINI_BRIDGE_CLI_JSON", "1")
+    monkeypatch.setenv("FAKE_GEMINI_OUTPUT_BYTES", "40")
+    data = json.loads(gcb.gemini_prompt(prompt="hello there"))
+    assert data["ok"] is True
+    assert len(data["stdout"]) == 40
+    assert data["stats"]["usage"]["candidates"] == 10
+    assert data["stats"]["spawn_ms"] > 0
+
+
+def test_fake_cli_failure_rate(monkeypatch, tmp_path):
+    _install_fake(monkeypatch, tmp_path)
+    monkeypatch.setenv("FAKE_GEMINI_FAILURE_RATE", "1")
+    data = json.loads(gcb.gemini_prompt(prompt="hi"))
+    assert data["ok"] is False
+    assert "429" in data["stderr"]
+
+
+def test_load_generator_counts_failures_reported_in_payload(monkeypatch, tmp_path):
+    monkeypatch.syspath_prepend(str(FAKE.parent))
+    import load_stdio
+
+    def call_result(text):
+        return {"jsonrpc": "2.0", "id": 1, "result": {"content": [{"type": "text", "text": text}], "isError": False}}
+
+    _install_fake(monkeypatch, tmp_path)
+    monkeypatch.setenv("FAKE_GEMINI_FAILURE_RATE", "1")
+    assert load_stdio.classify(call_result(gcb.gemini_prompt(prompt="hi"))) == "failed"
+    monkeypatch.setenv("FAKE_GEMINI_FAILURE_RATE", "0")
+    assert load_stdio.classify(call_result(gcb.gemini_prompt(prompt="hi"))) is None
+    assert load_stdio.classify(call_result('{"ok": false, "rate_limited": true}')) == "rate_limited"
+    assert load_stdio.classify(call_result('{"ok": false, "timed_out": true}')) == "timed_out"
+    assert load_stdio.classify(call_result("[1, 2]")) is None
+    assert load_stdio.classify({"jsonrpc": "2.0", "id": 1, "error": {"code": -32603}}) == "rpc"
+    assert load_stdio.classify({"jsonrpc": "2.0", "id": 1, "result": {"content": [], "isError": True}}) == "tool"
@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+import gemini_cli_bridge as gcb
+from gemini_cli_bridge import sessions
+
+
+@pytest.fixture
+def fake_cli(monkeypatch, fake_run):
+    monkeypatch.setattr(gcb, "_gemini_sessions", sessions._GeminiSessions())
+    state = {"reject": None, "session_id": "cli-123"}
+
+    def respond(cmd):
+        if state["reject"] and state["reject"] in cmd:
+            return {"exit_code": 1, "stdout": "", "stderr": f"Unknown argument: {state['reject'].lstrip('-')}"}
+        text = f"turn {len(fake_run.calls)}"
+        if "--output-format" not in cmd:
+            return {"stdout": text}
+        out = {"response": text, "stats": {}}
+        if state["session_id"]:
+            out["session_id"] = state["session_id"]
+        return {"stdout": json.dumps(out)}
+
+    fake_run.respond = respond
+    return fake_run.calls, state
+
+
+def _prompt(cmd):
+    return cmd[cmd.index("-p") + 1]
+
+
+def test_later_turns_resume_and_send_only_changed_files(tmp_path, fake_cli):
+    calls, _ = fake_cli
+    memory = tmp_path / "GEMINI.md"
+    memory.write_text("rules", encoding="utf-8")
+    notes = tmp_path / "notes.txt"
+    notes.write_text("v1", encoding="utf-8")
+    args = dict(memory_paths=[str(memory)], attachments=[str(notes)], session_id="s1")
+
+    first = json.loads(gcb.gemini_prompt_with_memory(prompt="hello", **args))
+    assert first["ok"] is True and first["stdout"] == "turn 1"
+    assert first["session"]["turn"] == 1 and first["session"]["resumed"] is False
+    assert "--checkpointing" in calls[0] and "--resume" not in calls[0]
+    assert str(memory) in _prompt(calls[0]) and str(notes) in _prompt(calls[0])
+
+    second = json.loads(gcb.gemini_prompt_with_memory(prompt="next", **args))
+    assert second["session"]["resumed"] is True
+    assert second["session"]["unchanged"] == [str(memory), str(notes)]
+    assert calls[1][calls[1].index("--resume") + 1] == "cli-123"
+    assert _prompt(calls[1]) == "next"
+
+    notes.write_text("v2", encoding="utf-8")
+    third = json.loads(gcb.gemini_prompt_with_memory(prompt="again", **args))
+    assert third["session"]["sent"] == [str(notes)]
+    assert str(notes) in _prompt(calls[2]) and str(memory) not in _prompt(calls[2])
+    assert "HIGH-PRIORITY" not in _prompt(calls[2])
+
+    listed = json.loads(gcb.gemini_sessions())["sessions"]
+    assert [(s["session_id"], s["turns"]) for s in listed] == [("s1", 3)]
+    assert json.loads(gcb.gemini_sessions(close="s1")) == {"closed": True, "sessions": []}
+
+
+def test_rejected_resume_falls_back_to_full_context(tmp_path, fake_cli):
+    calls, state = fake_cli
+    doc = tmp_path / "doc.md"
+    doc.write_text("x", encoding="utf-8")
+    gcb.gemini_prompt_plus(prompt="one", attachments=[str(doc)], session_id="s2")
+    state["reject"] = "--resume"
+    data = json.loads(gcb.gemini_prompt_plus(prompt="two", attachments=[str(doc)], session_id="s2"))
+    assert data["ok"] is True and data["session"]["resumed"] is False
+    assert "--resume" not in calls[-1] and str(doc) in _prompt(calls[-1])
+    assert json.loads(gcb.gemini_sessions())["sessions"][0]["resumable"] is False
+
+
+def test_unknown_cli_session_is_never_resumed(tmp_path, fake_cli):
+    calls, state = fake_cli
+    state["session_id"] = None  # CLI JSON without a session id
+    doc = tmp_path / "doc.md"
+    doc.write_text("x", encoding="utf-8")
+    gcb.gemini_prompt_plus(prompt="one", attachments=[str(doc)], session_id="s3")
+    data = json.loads(gcb.gemini_prompt_plus(prompt="two", attachments=[str(doc)], session_id="s3"))
+    assert data["ok"] is True and data["session"]["resumed"] is False
+    assert "--resume" not in calls[-1] and str(doc) in _prompt(calls[-1])
+    assert json.loads(gcb.gemini_sessions())["sessions"][0]["resumable"] is False
+
+
+def test_cli_without_json_output_falls_back_on_first_turn(fake_cli):
+    calls, state = fake_cli
+    state["reject"] = "--output-format"
+    data = json.loads(gcb.gemini_prompt_plus(prompt="one", session_id="s4"))
+    assert data["ok"] is True and data["stdout"] == "turn 2"
+    assert "--output-format" in calls[0] and "--output-format" not in calls[1]
+    assert json.loads(gcb.gemini_prompt_plus(prompt="two", session_id="s4"))["ok"] is True
+    assert len(calls) == 3 and "--resume" not in calls[2]
+    assert json.loads(gcb.gemini_sessions())["sessions"][0]["resumable"] is False
+
+
+def test_session_cap_evicts_least_recently_used(monkeypatch, fake_cli):
+    monkeypatch.setenv("GEMINI_BRIDGE_CHAT_MAX_SESSIONS", "1")
+    gcb.gemini_prompt_plus(prompt="a", session_id="old")
+    gcb.gemini_prompt_plus(prompt="b", session_id="new")
+    assert [s["session_id"] for s in json.loads(gcb.gemini_sessions())["sessions"]] == ["new"]
+
+
+def test_without_session_id_calls_stay_stateless(fake_cli):
+    calls, _ = fake_cli
+    gcb.gemini_prompt_plus(prompt="plain", attachments=["a.txt"])
+    assert "--checkpointing" not in calls[0] and "--output-format" not in calls[0]
+    assert _prompt(calls[0]) == 'plain\n\n@"a.txt"'
+    assert json.loads(gcb.gemini_sessions())["sessions"] == []
@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import gemini_cli_bridge as gcb
+from gemini_cli_bridge import transport
+
+
+@pytest.fixture
+def cli(monkeypatch, tmp_path, fake_run):
+    home = tmp_path / "home"
+    (home / ".gemini").mkdir(parents=True)
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    exe = bin_dir / "gemini"
+    exe.write_text("#!/bin/sh\n", encoding="utf-8")
+    exe.chmod(0o755)
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.setenv("PATH", f"{bin_dir}:/usr/bin:/bin")
+    monkeypatch.chdir(tmp_path)
+    fake_run.respond = lambda cmd: {"stdout": f"out {len(fake_run.calls)}"}
+    return {"calls": fake_run.calls, "run": fake_run, "home": home, "exe": exe}
+
+
+def test_repeat_calls_are_served_from_cache(cli):
+    first = json.loads(gcb.gemini_version())
+    second = json.loads(gcb.gemini_version())
+    assert len(cli["calls"]) == 1
+    assert "cached" not in first and second["cached"] is True
+    assert second["stdout"] == first["stdout"] == "out 1"
+    gcb.gemini_extensions_list()
+    gcb.gemini_mcp_list(scope="user")
+    gcb.gemini_mcp_list(scope="user")
+    assert len(cli["calls"]) == 3
+
+
+def test_settings_and_binary_changes_invalidate(cli):
+    gcb.gemini_mcp_list()
+    (cli["home"] / ".gemini" / "settings.json").write_text('{"mcpServers": {}}', encoding="utf-8")
+    gcb.gemini_mcp_list()
+    assert len(cli["calls"]) == 2
+    project = cli["home"].parent / ".gemini"
+    project.mkdir()
+    (project / "settings.json").write_text("{}", encoding="utf-8")
+    gcb.gemini_mcp_list()
+    assert len(cli["calls"]) == 3
+    st = os.stat(cli["exe"])
+    os.utime(cli["exe"], ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))  # CLI upgraded
+    gcb.gemini_mcp_list()
+    assert len(cli["calls"]) == 4
+
+
+def test_mcp_add_and_remove_invalidate_immediately(cli):
+    gcb.gemini_mcp_list()
+    gcb.gemini_mcp_add(name="srv", command_or_url="srv-bin")
+    gcb.gemini_mcp_list()
+    gcb.gemini_mcp_remove(name="srv")
+    gcb.gemini_mcp_list()
+    assert [c[2] for c in cli["calls"]] == ["list", "add", "list", "remove", "list"]
+
+
+def test_failures_are_not_cached_and_misses_share_one_run(cli):
+    cli["run"].exit_code = 1
+    gcb.gemini_version()
+    gcb.gemini_version()
+    assert len(cli["calls"]) == 2
+
+    cli["run"].exit_code, cli["run"].delay = 0, 0.3
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(json.loads(gcb.gemini_version()))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(cli["calls"]) == 3
+    assert {r["stdout"] for r in results} == {"out 3"}
+
+
+def test_prefetch_answers_first_call_without_spawning(cli):
+    gcb._get_metadata_cache().prefetch()
+    deadline = time.monotonic() + 5
+    while len(gcb._get_metadata_cache()._entries) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert json.loads(gcb.gemini_extensions_list())["cached"] is True
+    assert json.loads(gcb.gemini_mcp_list())["cached"] is True
+    assert len(cli["calls"]) == 3
+
+
+def test_cache_can_be_disabled(cli, monkeypatch):
+    monkeypatch.setenv("GEMINI_BRIDGE_METADATA_CACHE", "0")
+    gcb.gemini_version()
+    gcb.gemini_version()
+    assert len(cli["calls"]) == 2
+
+
+def test_network_main_configures_scheduler_before_prefetch(monkeypatch):
+    order = []
+    monkeypatch.setattr(gcb, "_tool_groups", {"gemini_admin": {"enabled": True, "tools": []}})
+    monkeypatch.setattr(transport, "_network_transport_error", lambda: None)
+    monkeypatch.setattr(gcb, "_configure_shared_scheduler", lambda: order.append("scheduler"))
+    monkeypatch.setattr(gcb._get_metadata_cache(), "prefetch", lambda: order.append("prefetch"))
+    monkeypatch.setattr(transport, "_serve_network", lambda kind, *a: order.append(kind))
+    gcb.main(["--transport", "http"])
+    assert order == ["scheduler", "prefetch", "streamable-http"]
@@ -0,0 +1,44 @@
+import json
+import subprocess
+
+import pytest
+
+import gemini_cli_bridge as gcb
+
+
+def test_histogram_quantiles_within_bucket_bounds():
+    h = gcb._Histogram()
+    for ms in [3] * 90 + [400] * 10:
+        h.observe(ms)
+    s = h.summary()
+    assert s["count"] == 100
+    assert 2.5 <= s["p50"] <= 5
+    assert 250 <= s["p99"] <= 400
+    assert s["max"] == 400
+
+
+def test_instrumented_tool_records_calls_errors_and_timeouts(monkeypatch):
+    monkeypatch.setattr(gcb, "_metrics", gcb._Metrics())
+
+    @gcb._instrumented
+    def sample_tool(fail: str = "") -> str:
+        if fail == "timeout":
+            raise subprocess.TimeoutExpired(["x"], 1)
+        if fail == "soft":
+            gcb._mark_call(error=True)
+        return "ok"
+
+    assert sample_tool() == "ok"
+    sample_tool(fail="soft")
+    with pytest.raises(subprocess.TimeoutExpired):
+        sample_tool(fail="timeout")
+
+    stats = json.loads(gcb.bridge_stats())["tools"]["sample_tool"]
+    assert stats["calls"] == 3
+    assert stats["errors"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["latency_ms"]["count"] == 3
+
+    text = gcb.bridge_stats(format="prometheus")
+    assert 'gemini_bridge_tool_calls_total{tool="sample_tool"} 3' in text
+    assert 'gemini_bridge_tool_latency_seconds_bucket{tool="sample_tool",le="+Inf"} 3' in text
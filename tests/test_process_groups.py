@@ -0,0 +1,56 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import gemini_cli_bridge as gcb
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="process groups are POSIX-only")
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # Reparented zombies count as gone
+    try:
+        with open(f"/proc/{pid}/stat", encoding="utf-8") as f:
+            return f.read().split()[2] != "Z"
+    except OSError:
+        return True
+
+
+def test_timeout_reaps_whole_group_and_keeps_partial_output(monkeypatch):
+    monkeypatch.setenv("GEMINI_BRIDGE_KILL_GRACE_S", "1")
+    res = gcb._run(["/bin/sh", "-c", "sleep 30 & echo child=$!; sleep 30"], timeout_s=1, raise_on_error=False)
+    assert res["timed_out"] is True
+    assert res["exit_code"] == 124
+    child = int(str(res["stdout"]).strip().split("=", 1)[1])
+    deadline = time.time() + 2
+    while _alive(child) and time.time() < deadline:
+        time.sleep(0.05)
+    assert not _alive(child)
+
+
+def test_cancel_event_stops_run():
+    cancel = threading.Event()
+    threading.Timer(0.3, cancel.set).start()
+    t0 = time.perf_counter()
+    res = gcb._run(["/bin/sh", "-c", "echo partial; sleep 30"], timeout_s=60, raise_on_error=False, cancel=cancel)
+    assert time.perf_counter() - t0 < 5
+    assert res["cancelled"] is True
+    assert res["exit_code"] == 130
+    assert "partial" in res["stdout"]
+
+
+def test_shell_timeout_reports_effective_timeout(monkeypatch):
+    monkeypatch.setenv("MCP_BASH_ALLOW", "1")
+    monkeypatch.setenv("GEMINI_BRIDGE_DEFAULT_TIMEOUT_S", "1")
+    monkeypatch.setenv("GEMINI_BRIDGE_KILL_GRACE_S", "1")
+    data = json.loads(gcb.Shell("echo before; sleep 30"))
+    assert data["code"] == 124
+    assert data["stdout"].strip() == "before"
+    assert data["stderr"].endswith("timeout after 1s")
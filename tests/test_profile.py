@@ -0,0 +1,29 @@
+import json
+from pathlib import Path
+
+import gemini_cli_bridge as gcb
+from gemini_cli_bridge import profiling
+
+
+def test_bridge_profile_captures_next_call(monkeypatch, tmp_path):
+    monkeypatch.setattr(gcb, "_profiler", profiling._Profiler())
+    status = json.loads(gcb.bridge_profile(calls=1, directory=str(tmp_path), top=5))
+    assert status["armed"] is True
+    assert status["remaining_calls"] == 1
+
+    @gcb._instrumented
+    def busy_tool() -> str:
+        blob = [str(i) * 10 for i in range(20000)]
+        return json.dumps({"ok": True, "n": len(blob)})
+
+    data = json.loads(busy_tool())
+    prof = data["profile"]
+    assert prof["tool"] == "busy_tool"
+    assert prof["peak_alloc_bytes"] > 0
+    assert 0 < len(prof["top_functions"]) <= 5
+    for kind in ("pstats", "folded", "tracemalloc"):
+        assert Path(prof["files"][kind]).exists()
+
+    # Budget consumed: next call is not profiled
+    assert "profile" not in json.loads(busy_tool())
+    assert json.loads(gcb.bridge_profile())["armed"] is False
@@ -0,0 +1,91 @@
+import json
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+import gemini_cli_bridge as gcb
+from gemini_cli_bridge import ratelimit
+
+
+def test_fail_fast_reports_retry_after():
+    limiter = ratelimit._RateLimiter({"gcs": {"rpm": 60, "burst": 1}}, mode="fail")
+    with limiter.limit("gcs"):
+        pass
+    with pytest.raises(gcb._RateLimited) as exc:
+        limiter.acquire(["gcs"])
+    assert exc.value.key == "gcs"
+    assert 0 < exc.value.retry_after_s <= 1.0
+    assert limiter.acquire(["webfetch:example.com"]) == []  # unconfigured keys are unlimited
+
+
+def test_wait_mode_blocks_until_refill_and_caps_concurrency():
+    limiter = ratelimit._RateLimiter({"webfetch:*": {"rpm": 600, "burst": 1, "concurrency": 1}}, max_wait_s=5)
+    t0 = time.monotonic()
+    first = limiter.acquire(["webfetch:a.example"])
+    limiter.release(first)
+    limiter.release(limiter.acquire(["webfetch:a.example"]))  # waits ~0.1s for a token
+    assert time.monotonic() - t0 >= 0.05
+    held = limiter.acquire(["webfetch:b.example"])  # per-host bucket from the wildcard
+    fast = ratelimit._RateLimiter({"webfetch:*": {"concurrency": 1, "mode": "fail"}})
+    fast.acquire(["webfetch:b.example"])
+    with pytest.raises(gcb._RateLimited):
+        fast.acquire(["webfetch:b.example"])
+    limiter.release(held)
+    snap = limiter.snapshot()["buckets"]
+    assert set(snap) == {"webfetch:a.example", "webfetch:b.example"}
+    assert snap["webfetch:b.example"]["active"] == 0
+
+
+def test_levels_survive_restart(tmp_path):
+    state = tmp_path / "ratelimits.json"
+    limits = {"gemini:gemini-2.5-pro": {"rpm": 1, "burst": 3}}
+    limiter = ratelimit._RateLimiter(limits, mode="fail", state_path=str(state))
+    for _ in range(3):
+        limiter.release(limiter.acquire(["gemini:gemini-2.5-pro"]))
+    limiter.save(force=True)
+    restarted = ratelimit._RateLimiter(limits, mode="fail", state_path=str(state))
+    with pytest.raises(gcb._RateLimited):
+        restarted.acquire(["gemini:gemini-2.5-pro"])
+
+
+def test_gemini_runs_are_limited_per_model(monkeypatch, fake_run):
+    monkeypatch.setattr(gcb, "_rate_limiter", ratelimit._RateLimiter({"gemini:*": {"rpm": 1, "burst": 1}}, mode="fail"))
+    assert json.loads(gcb.gemini_prompt(prompt="a"))["ok"] is True
+    data = json.loads(gcb.gemini_prompt(prompt="b"))
+    assert data["ok"] is False and data["rate_limited"] is True and data["retry_after_s"] > 0
+    assert len(fake_run.calls) == 1
+    assert json.loads(gcb.gemini_prompt(prompt="c", model="gemini-2.5-flash"))["ok"] is True
+    assert json.loads(gcb.gemini_version())["ok"] is True  # metadata commands are not limited
+
+    levels = json.loads(gcb.bridge_rate_limits())
+    assert levels["mode"] == "fail"
+    assert levels["buckets"]["gemini:gemini-2.5-pro"]["limited"] == 1
+
+
+def test_parse_rate_limits_shorthand():
+    assert ratelimit._parse_rate_limits('{"gcs": 100, "gemini": {"concurrency": 2}, "bad": "x"}') == {
+        "gcs": {"rpm": 100},
+        "gemini": {"concurrency": 2},
+    }
+    assert ratelimit._parse_rate_limits("not json") == {}
+
+
+def test_cancelled_request_stops_waiting_for_a_token(monkeypatch):
+    limiter = ratelimit._RateLimiter({"webfetch": {"rpm": 6, "burst": 1}}, max_wait_s=60)
+    limiter.release(limiter.acquire(["webfetch"]))  # next token in ~10 s
+    monkeypatch.setattr(gcb, "_rate_limiter", limiter)
+    monkeypatch.setattr(gcb, "_is_private_url", lambda url: False)
+    monkeypatch.setitem(sys.modules, "requests", types.SimpleNamespace(get=lambda *a, **k: pytest.fail("fetched")))
+    cancel = threading.Event()
+    token = gcb._cancel_event.set(cancel)
+    try:
+        threading.Timer(0.2, cancel.set).start()
+        t0 = time.monotonic()
+        data = json.loads(gcb.WebFetch("https://example.com/"))
+    finally:
+        gcb._cancel_event.reset(token)
+    assert time.monotonic() - t0 < 5
+    assert data["rate_limited"] is True
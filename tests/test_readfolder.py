@@ -0,0 +1,87 @@
+import json
+import os
+
+import gemini_cli_bridge as gcb
+from gemini_cli_bridge import files
+
+
+def _tree(root):
+    (root / "a").mkdir()
+    (root / "a" / "deep").mkdir()
+    (root / "a" / "deep" / "x.txt").write_text("x", encoding="utf-8")
+    (root / "a" / "one.py").write_text("print(1)\n", encoding="utf-8")
+    (root / "big").mkdir()
+    for i in range(40):
+        (root / "big" / f"f{i:02d}.log").write_text("", encoding="utf-8")
+    (root / "node_modules").mkdir()
+    (root / "node_modules" / "pkg.js").write_text("", encoding="utf-8")
+    (root / "z.md").write_text("hello", encoding="utf-8")
+
+
+def test_non_recursive_keeps_array_shape(tmp_path):
+    _tree(tmp_path)
+    items = json.loads(gcb.ReadFolder(str(tmp_path)))
+    assert items == [str(tmp_path / n) + s for n, s in (("a", "/"), ("big", "/"), ("node_modules", "/"), ("z.md", ""))]
+
+
+def test_recursive_cap_is_exact_inside_one_huge_directory(tmp_path):
+    _tree(tmp_path)
+    items = json.loads(gcb.ReadFolder(str(tmp_path), recursive=True, max_entries=10))
+    assert len(items) == 10
+    assert items[:4] == [str(tmp_path / "a") + "/", str(tmp_path / "a" / "deep") + "/",
+                         str(tmp_path / "a" / "deep" / "x.txt"), str(tmp_path / "a" / "one.py")]
+
+
+def test_cursor_pages_cover_listing_once(tmp_path):
+    _tree(tmp_path)
+    full = json.loads(gcb.ReadFolder(str(tmp_path), recursive=True, max_entries=1000))
+    pages, cursor = [], ""
+    while True:
+        page = json.loads(gcb.ReadFolder(str(tmp_path), recursive=True, max_entries=7, cursor=cursor))
+        assert len(page["entries"]) <= 7
+        pages.extend(page["entries"])
+        if not page["truncated"]:
+            assert page["next_cursor"] is None
+            break
+        cursor = page["next_cursor"]
+    assert pages == full and len(full) == 48
+
+
+def test_max_depth_ignore_and_details(tmp_path):
+    _tree(tmp_path)
+    os.utime(tmp_path / "z.md", (1_700_000_000, 1_700_000_000))
+    data = json.loads(gcb.ReadFolder(str(tmp_path), max_depth=2, ignore=["big/", "node_modules"], details=True))
+    paths = [e["path"] for e in data["entries"]]
+    assert str(tmp_path / "a" / "deep") + "/" in paths
+    assert str(tmp_path / "a" / "deep" / "x.txt") not in paths  # depth 3
+    assert not any("big" in p or "node_modules" in p for p in paths)
+    z = next(e for e in data["entries"] if e["path"].endswith("z.md"))
+    assert z == {"path": str(tmp_path / "z.md"), "type": "file", "size": 5, "mtime": 1_700_000_000}
+    assert next(e for e in data["entries"] if e["path"].endswith("/a/"))["type"] == "dir"
+
+
+def test_missing_directory_reports_error(tmp_path):
+    assert "error" in json.loads(gcb.ReadFolder(str(tmp_path / "nope"), recursive=True))
+
+
+def test_large_directory_pages_reuse_sorted_listing(tmp_path, monkeypatch):
+    monkeypatch.setattr(files, "_LISTING_CACHE_MIN", 10)
+    monkeypatch.setattr(files, "_listing_cache", {})
+    _tree(tmp_path)
+    scans = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(files.os, "scandir", lambda p: scans.append(p) or real_scandir(p))
+    big = str(tmp_path / "big")
+    first = json.loads(gcb.ReadFolder(big, max_entries=5, cursor=""))
+    second = json.loads(gcb.ReadFolder(big, max_entries=5, cursor=first["next_cursor"]))
+    assert [e.rsplit("/", 1)[1] for e in first["entries"] + second["entries"]] == [f"f{i:02d}.log" for i in range(10)]
+    assert scans == [big]
+    (tmp_path / "big" / "f00a.log").write_text("", encoding="utf-8")  # changes the directory's mtime
+    third = json.loads(gcb.ReadFolder(big, max_entries=2, cursor=""))
+    assert third["entries"][1].endswith("f00a.log") and len(scans) == 2
+
+
+def test_zero_max_entries_still_makes_progress(tmp_path):
+    _tree(tmp_path)
+    page = json.loads(gcb.ReadFolder(str(tmp_path), max_entries=0, cursor=""))
+    assert page["entries"] == [str(tmp_path / "a") + "/"] and page["next_cursor"] == "a"
@@ -0,0 +1,91 @@
+import json
+import time
+
+import gemini_cli_bridge as gcb
+from gemini_cli_bridge import routing
+
+
+def _by_model(behaviour):
+    """fake_run.respond from model -> (exit_code, stderr, delay_s)."""
+
+    def respond(cmd):
+        model = gcb._cmd_option(cmd, "-m")
+        code, err, delay = behaviour[model]
+        return {"exit_code": code, "stdout": f"answer from {model}" if code == 0 else "", "stderr": err, "delay": delay}
+
+    return respond
+
+
+def _models(fake_run):
+    return [gcb._cmd_option(cmd, "-m") for cmd in fake_run.calls]
+
+
+def test_routing_off_by_default(monkeypatch, fake_run):
+    monkeypatch.delenv("GEMINI_BRIDGE_ROUTING", raising=False)
+    monkeypatch.delenv("GEMINI_BRIDGE_HEDGE_MODEL", raising=False)
+    monkeypatch.delenv("GEMINI_BRIDGE_FALLBACK_MODELS", raising=False)
+    assert routing._routing_policy("gemini_prompt") is None
+    fake_run.respond = _by_model({"gemini-2.5-pro": (0, "", 0)})
+    data = json.loads(gcb.gemini_prompt(prompt="hi"))
+    assert data["ok"] is True and _models(fake_run) == ["gemini-2.5-pro"]
+    assert "routing" not in data["stats"]
+
+
+def test_fallback_on_quota_error(monkeypatch, fake_run):
+    monkeypatch.setattr(gcb, "_usage", gcb._UsageStats(window=10))
+    monkeypatch.setenv("GEMINI_BRIDGE_FALLBACK_MODELS", "gemini-2.5-flash")
+    behaviour = {
+        "gemini-2.5-pro": (1, "Error: 429 RESOURCE_EXHAUSTED: Quota exceeded", 0),
+        "gemini-2.5-flash": (0, "", 0),
+    }
+    fake_run.respond = _by_model(behaviour)
+    data = json.loads(gcb.gemini_prompt(prompt="hi"))
+    assert data["ok"] is True
+    assert data["stdout"] == "answer from gemini-2.5-flash"
+    assert data["stats"]["model"] == "gemini-2.5-flash"
+    info = data["stats"]["routing"]
+    assert info["requested_model"] == "gemini-2.5-pro" and info["fallback"] is True
+    assert [a["model"] for a in info["attempts"]] == _models(fake_run) == ["gemini-2.5-pro", "gemini-2.5-flash"]
+    # the quota failure still counts against the primary's error rate
+    summary = json.loads(gcb.gemini_usage_stats())
+    assert summary["by_model"]["gemini-2.5-pro"]["errors"] == 1
+    assert summary["by_tool"]["gemini_prompt"]["count"] == 1
+
+
+def test_non_quota_error_does_not_fall_back(monkeypatch, fake_run):
+    monkeypatch.setenv("GEMINI_BRIDGE_FALLBACK_MODELS", "gemini-2.5-flash")
+    behaviour = {"gemini-2.5-pro": (1, "Error: invalid argument", 0), "gemini-2.5-flash": (0, "", 0)}
+    fake_run.respond = _by_model(behaviour)
+    data = json.loads(gcb.gemini_prompt(prompt="hi"))
+    assert data["ok"] is False and _models(fake_run) == ["gemini-2.5-pro"]
+
+
+def test_hedge_takes_first_answer_and_cancels_slow_primary(monkeypatch, fake_run):
+    monkeypatch.setenv("GEMINI_BRIDGE_ROUTING", json.dumps({
+        "gemini_prompt": {"hedge_model": "gemini-2.5-flash", "hedge_after_ms": 50},
+    }))
+    behaviour = {"gemini-2.5-pro": (0, "", 5.0), "gemini-2.5-flash": (0, "", 0.0)}
+    fake_run.respond = _by_model(behaviour)
+    t0 = time.perf_counter()
+    data = json.loads(gcb.gemini_prompt(prompt="hi"))
+    assert time.perf_counter() - t0 < 2.0
+    assert data["ok"] is True and data["stats"]["model"] == "gemini-2.5-flash"
+    info = data["stats"]["routing"]
+    assert info["hedged"] is True and info["fallback"] is False
+    by_model = {a["model"]: a for a in info["attempts"]}
+    assert by_model["gemini-2.5-pro"].get("cancelled") is True
+    assert by_model["gemini-2.5-flash"]["hedge"] is True
+    # other tools are not routed by a per-tool entry
+    assert routing._routing_policy("gemini_search") is None
+
+
+def test_hedge_deadline_follows_observed_p95(monkeypatch):
+    stats = gcb._UsageStats(window=200)
+    monkeypatch.setattr(gcb, "_usage", stats)
+    policy = dict(routing._ROUTING_DEFAULTS, hedge_model="gemini-2.5-flash", hedge_min_samples=20, hedge_min_ms=0)
+    assert routing._hedge_deadline_ms("gemini-2.5-pro", policy) is None  # not enough samples yet
+    for ms in range(1, 101):
+        stats.record("gemini-2.5-pro", "gemini_prompt", {"ok": True, "wall_ms": float(ms)})
+    stats.record("gemini-2.5-pro", "gemini_prompt", {"ok": False, "wall_ms": 99999.0})
+    assert routing._hedge_deadline_ms("gemini-2.5-pro", policy) == 95.0
+    assert routing._hedge_deadline_ms("gemini-2.5-pro", dict(policy, hedge_min_ms=500)) == 500.0
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+import gemini_cli_bridge as gcb
+
+
+def test_parse_cli_env_defaults(monkeypatch):
+    monkeypatch.setenv("GEMINI_BRIDGE_TRANSPORT", "http")
+    monkeypatch.setenv("GEMINI_BRIDGE_PORT", "9999")
+    args = gcb._parse_cli([])
+    assert (args.transport, args.host, args.port) == ("http", "127.0.0.1", 9999)
+    assert gcb._parse_cli(["--transport", "sse", "--port", "1234"]).port == 1234
+
+
+def test_fair_scheduler_caps_sessions_and_serves_newcomers():
+    sched = gcb._FairScheduler(capacity=2, per_session=1)
+    sched.acquire("slow")
+    order = []
+
+    def worker(session):
+        with sched.slot(session):
+            order.append(session)
+
+    # A second "slow" request must wait behind the per-session cap; "fast" gets the free slot
+    t_slow = threading.Thread(target=worker, args=("slow",))
+    t_slow.start()
+    time.sleep(0.05)
+    t_fast = threading.Thread(target=worker, args=("fast",))
+    t_fast.start()
+    t_fast.join(timeout=2)
+    assert order == ["fast"]
+    sched.release("slow")
+    t_slow.join(timeout=2)
+    assert order == ["fast", "slow"]
+    assert sched.snapshot()["active"] == 0
+
+
+def test_fair_scheduler_hands_every_freed_slot_to_a_waiter():
+    sched = gcb._FairScheduler(capacity=3)
+    sched.acquire("b")
+    sched.acquire("h")
+    sched.acquire("h")
+    got = []
+
+    def worker(session):
+        sched.acquire(session)
+        got.append(session)
+
+    threads = [threading.Thread(target=worker, args=(s,), daemon=True) for s in ("b", "a")]
+    for t in threads:
+        t.start()
+        time.sleep(0.05)
+    sched.release("h")
+    sched.release("h")  # both slots free before either waiter runs; "a" is preferred
+    for t in threads:
+        t.join(timeout=2)
+    assert sorted(got) == ["a", "b"]
+    assert sched.snapshot()["active"] == 3
+
+
+def test_async_adapter_runs_calls_concurrently_and_refuses_when_draining(monkeypatch):
+    def slow_tool(delay: float = 0.2) -> str:
+        time.sleep(delay)
+        return gcb._current_session.get()
+
+    runner = gcb._async_adapter(slow_tool)
+
+    async def go():
+        t0 = time.perf_counter()
+        results = await asyncio.gather(runner(), runner(), runner())
+        return results, time.perf_counter() - t0
+
+    results, elapsed = asyncio.run(go())
+    assert results == ["local"] * 3
+    assert elapsed < 0.5  # would be >= 0.6 if calls serialized on the event loop
+
+    monkeypatch.setattr(gcb, "_draining", threading.Event())
+    gcb._draining.set()
+    with pytest.raises(RuntimeError):
+        asyncio.run(runner())
+
+
+def test_network_transport_needs_http_capable_fastmcp(monkeypatch):
+    monkeypatch.setattr(gcb, "mcp", object())
+    with pytest.raises(SystemExit, match="fastmcp>=2.9"):
+        gcb.main(["--transport", "http"])
+
+
+def test_session_id_falls_back_when_context_lacks_it(monkeypatch):
+    # fastmcp<2.9 Context has no session_id; stdio tool calls must still work
+    deps = types.ModuleType("fastmcp.server.dependencies")
+    deps.get_context = lambda: object()
+    monkeypatch.setitem(sys.modules, "fastmcp.server.dependencies", deps)
+    assert gcb._request_session_id() == "local"
+    deps.get_context = lambda: types.SimpleNamespace(session_id="abc")
+    assert gcb._request_session_id() == "abc"
+
+
+def test_cancelled_call_stops_waiting_for_a_scheduler_slot(monkeypatch, fake_run):
+    sched = gcb._FairScheduler(capacity=1)
+    sched.acquire("other")  # the only slot stays busy
+    monkeypatch.setattr(gcb, "_scheduler", sched)
+    cancel = threading.Event()
+    token = gcb._cancel_event.set(cancel)
+    try:
+        threading.Timer(0.2, cancel.set).start()
+        t0 = time.monotonic()
+        data = json.loads(gcb.gemini_prompt(prompt="hi"))
+    finally:
+        gcb._cancel_event.reset(token)
+    assert time.monotonic() - t0 < 2
+    assert data["ok"] is False and data["cancelled"] is True
+    assert fake_run.calls == []
+    assert sched.snapshot()["waiting"] == 0 and sched.snapshot()["active"] == 1
@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import gemini_cli_bridge as gcb
+from gemini_cli_bridge import shell
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="shell sessions need /bin/sh")
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    monkeypatch.setenv("MCP_BASH_ALLOW", "1")
+    monkeypatch.setenv("GEMINI_BRIDGE_KILL_GRACE_S", "1")
+    store = shell._ShellSessions()
+    monkeypatch.setattr(gcb, "_shell_sessions", store)
+    yield store
+    store.close_all()
+
+
+def test_session_keeps_state_between_commands(sessions, tmp_path):
+    first = json.loads(gcb.Shell(f"cd {tmp_path} && export GCB_X=42", session="s1"))
+    assert first["code"] == 0
+    out = json.loads(gcb.Shell("pwd; echo $GCB_X; printf 'no-newline'", session="s1"))
+    assert out["code"] == 0
+    assert out["stdout"] == f"{tmp_path}\n42\nno-newline"
+    err = json.loads(gcb.Shell("echo oops >&2; false", session="s1"))
+    assert err == {"code": 1, "stdout": "", "stderr": "oops\n"}
+    # Syntax errors stay inside eval and don't break the session
+    assert json.loads(gcb.Shell("if then", session="s1"))["code"] != 0
+    assert json.loads(gcb.Shell("echo $GCB_X", session="s1"))["stdout"] == "42\n"
+    listed = json.loads(gcb.ShellSessions())["sessions"]
+    assert [s["session"] for s in listed] == ["s1"]
+
+
+def test_session_timeout_discards_session(sessions):
+    gcb.Shell("export GCB_Y=1", session="t")
+    data = json.loads(gcb.Shell("echo partial; sleep 30", session="t", timeout_s=1))
+    assert data["code"] == 124
+    assert data["stdout"].strip() == "partial"
+    assert data["stderr"].endswith("timeout after 1s")
+    # A fresh shell replaces the killed one
+    assert json.loads(gcb.Shell("echo ${GCB_Y:-unset}", session="t"))["stdout"] == "unset\n"
+
+
+def test_call_queued_behind_a_dropped_session_gets_a_fresh_one(sessions):
+    first = threading.Thread(target=gcb.Shell, args=("sleep 5",), kwargs={"session": "x", "timeout_s": 1})
+    first.start()
+    time.sleep(0.2)  # the second call queues on the busy session's lock
+    data = json.loads(gcb.Shell("echo hi", session="x"))
+    first.join()
+    assert data == {"code": 0, "stdout": "hi\n", "stderr": ""}
+    assert len(sessions._sessions) == 1
+
+
+def test_session_cap_evicts_least_recently_used(sessions, monkeypatch):
+    monkeypatch.setenv("GEMINI_BRIDGE_SHELL_MAX_SESSIONS", "2")
+    for name in ("a", "b", "c"):
+        gcb.Shell("true", session=name)
+    names = [s["session"] for s in json.loads(gcb.ShellSessions())["sessions"]]
+    assert names == ["b", "c"]
+    assert json.loads(gcb.ShellSessions(close="b"))["closed"] is True
+
+
+def test_idle_session_is_reaped_without_further_calls(sessions, monkeypatch):
+    monkeypatch.setenv("GEMINI_BRIDGE_SHELL_IDLE_S", "1")
+    gcb.Shell("true", session="idle")
+    proc = next(iter(sessions._sessions.values())).proc
+    proc.wait(timeout=5)  # closed by the reaper, not by another Shell call
+    assert json.loads(gcb.ShellSessions())["sessions"] == []
+    deadline = time.monotonic() + 2
+    while sessions._reaper is not None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert sessions._reaper is None
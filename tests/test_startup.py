@@ -0,0 +1,89 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import gemini_cli_bridge as gcb
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "benchmarks"))
+import bench_startup  # noqa: E402
+
+# Own import cost of gemini_cli_bridge (fastmcp excluded), best of 3 fresh interpreters.
+# Measured at ~30-45 ms with cached bytecode; the budget leaves room for slower CI hosts only.
+IMPORT_BUDGET_MS = float(os.getenv("GEMINI_BRIDGE_IMPORT_BUDGET_MS", "75"))
+# Only needed by individual tools; importing them at startup is a regression.
+LAZY_MODULES = {"urllib.request", "http.client", "ssl", "requests", "hashlib", "tempfile",
+                "uvicorn", "cProfile", "tracemalloc", "queue",
+                "gemini_cli_bridge.profiling", "gemini_cli_bridge.ratelimit", "gemini_cli_bridge.routing",
+                "gemini_cli_bridge.metadata", "gemini_cli_bridge.sessions", "gemini_cli_bridge.shell",
+                "gemini_cli_bridge.transport",
+                "gemini_cli_bridge.files", "gemini_cli_bridge.web", "gemini_cli_bridge.search"}
+# Tool-group submodules: imported at startup only when their group is enabled.
+GROUP_MODULES = {"gemini_cli_bridge.files", "gemini_cli_bridge.web", "gemini_cli_bridge.search"}
+
+
+def _env(**extra):
+    env = os.environ.copy()
+    # the fastmcp shim keeps the measurement about this repo, whatever fastmcp is installed
+    env["PYTHONPATH"] = os.pathsep.join([str(ROOT / "tests"), str(ROOT)])
+    env.pop("GEMINI_BRIDGE_TOOL_GROUPS", None)
+    env.pop("GEMINI_BRIDGE_DISABLE_TOOL_GROUPS", None)
+    env.update(extra)
+    return env
+
+
+def test_import_time_budget_and_lazy_modules():
+    runs = [bench_startup.import_profile(_env()) for _ in range(3)]
+    best = min(r["bridge_own_ms"] for r in runs)
+    assert best < IMPORT_BUDGET_MS, f"import took {best:.1f} ms (budget {IMPORT_BUDGET_MS} ms): {runs[0]['top_imports']}"
+    assert not (LAZY_MODULES - GROUP_MODULES) & set(runs[0]["modules"])
+    assert GROUP_MODULES <= set(runs[0]["modules"])
+    gemini_only = bench_startup.import_profile(_env(GEMINI_BRIDGE_TOOL_GROUPS="gemini"))
+    assert not LAZY_MODULES & set(gemini_only["modules"])
+
+
+def test_disabled_tool_groups_are_not_registered(monkeypatch):
+    registered = []
+
+    class RecordingMCP:
+        def tool(self):
+            def _decorator(fn):
+                registered.append(fn.__name__)
+                return fn
+            return _decorator
+
+    monkeypatch.setattr(gcb, "mcp", RecordingMCP())
+    monkeypatch.setattr(gcb, "_tool_groups", {})
+    monkeypatch.setenv("GEMINI_BRIDGE_TOOL_GROUPS", "gemini,files,web")
+    monkeypatch.setenv("GEMINI_BRIDGE_DISABLE_TOOL_GROUPS", "web")
+
+    def kept() -> str:
+        return "kept"
+
+    def dropped() -> str:
+        return "dropped"
+
+    def web_tool() -> str:
+        return "web"
+
+    assert gcb._tool("files")(kept)() == "kept"
+    assert gcb._tool("shell")(dropped)() == "dropped"  # still callable in-process
+    gcb._tool("web")(web_tool)
+    assert registered == ["kept"]
+    assert gcb._tool_groups["shell"] == {"enabled": False, "tools": ["dropped"]}
+    assert set(gcb._tool_groups) <= set(gcb._TOOL_GROUPS)
+
+
+def test_disabled_group_module_loads_on_first_access():
+    code = """
+import json, sys
+import gemini_cli_bridge as gcb
+listed = {"enabled": False, "tools": list(gcb._TOOL_MODULES["files"])}
+assert "gemini_cli_bridge.files" not in sys.modules
+assert gcb._tool_groups["files"] == listed
+assert isinstance(json.loads(gcb.ReadFolder(".")), list)  # still callable in-process
+assert "gemini_cli_bridge.files" in sys.modules and gcb._tool_groups["files"] == listed
+"""
+    env = _env(GEMINI_BRIDGE_DISABLE_TOOL_GROUPS="files")
+    subprocess.run([sys.executable, "-c", code], cwd=str(ROOT), env=env, check=True)
@@ -0,0 +1,48 @@
+import json
+
+import gemini_cli_bridge as gcb
+
+
+CLI_JSON = json.dumps({
+    "response": "hi there",
+    "stats": {
+        "models": {
+            "gemini-2.5-pro": {
+                "api": {"totalRequests": 1, "totalErrors": 0, "totalLatencyMs": 900},
+                "tokens": {"prompt": 120, "candidates": 8, "total": 140, "cached": 0, "thoughts": 12, "tool": 0},
+            }
+        }
+    },
+})
+
+
+def test_parse_cli_json_extracts_usage():
+    parsed = gcb._parse_cli_json(CLI_JSON)
+    assert parsed["response"] == "hi there"
+    assert parsed["models"] == ["gemini-2.5-pro"]
+    assert parsed["usage"]["prompt"] == 120
+    assert parsed["usage"]["total"] == 140
+    assert gcb._parse_cli_json("plain text answer") is None
+
+
+def test_gemini_response_includes_stats_and_feeds_summary(monkeypatch, fake_run):
+    monkeypatch.setenv("GEMINI_BRIDGE_CLI_JSON", "1")
+    monkeypatch.setattr(gcb, "_usage", gcb._UsageStats(window=10))
+    fake_run.respond = lambda cmd: {
+        "stdout": CLI_JSON,
+        "timing": {"spawn_ms": 1.5, "wall_ms": 42.0},
+        "bytes_out": len(CLI_JSON),
+    }
+    data = json.loads(gcb.gemini_prompt(prompt="hello"))
+    assert fake_run.calls[0][-2:] == ["--output-format", "json"]
+    assert data["ok"] is True
+    assert data["stdout"] == "hi there"
+    stats = data["stats"]
+    assert stats["model"] == "gemini-2.5-pro"
+    assert stats["wall_ms"] == 42.0
+    assert stats["prompt_chars"] == len("hello")
+    assert stats["usage"]["candidates"] == 8
+
+    summary = json.loads(gcb.gemini_usage_stats())
+    assert summary["by_model"]["gemini-2.5-pro"]["count"] == 1
+    assert summary["by_tool"]["gemini_prompt"]["tokens"]["total"] == 140